@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import argparse
+import functools
+import timeit
+from datetime import datetime
+
+srcPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, srcPath)
+import ofac_records  # noqa: E402  pylint: disable=wrong-import-position
+
+# --a mix of the date of birth values found in the sdn file
+SAMPLE_DATES = [
+    "12 Jan 1955",
+    "01 Feb 1962",
+    "1961",
+    "1958",
+    "circa 1960",
+    "circa 1974",
+    "1955 to 1958",
+    "1970 to 1972",
+    "Mar 1962",
+    "1980-01-05",
+]
+
+
+# ----------------------------------------
+def legacy_format_date(inStr, outputFormat="%Y-%m-%d"):
+    """the formatDate() this repo shipped with, kept for comparison"""
+    outStr = inStr
+    formatList = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d %b %Y", "%d %m %Y"]
+    for format in formatList:
+        try:
+            outStr = datetime.strftime(datetime.strptime(inStr, format), outputFormat)
+        except:
+            pass
+        else:
+            break
+    return outStr
+
+
+# ----------------------------------------
+def legacy_run(dates):
+    # --the old mapper called it twice per date of birth
+    for dateStr in dates:
+        if legacy_format_date(dateStr):
+            legacy_format_date(dateStr)
+
+
+# ----------------------------------------
+def cached_run(dates):
+    for dateStr in dates:
+        ofac_records.formatDate(dateStr)
+
+
+# ----------------------------------------
+def uncached_run(dates):
+    for dateStr in dates:
+        ofac_records.formatDate.cache_clear()
+        ofac_records.formatDate(dateStr)
+
+
+# ----------------------------------------
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    argparser.add_argument(
+        "-n", "--number", type=int, default=2000, help="times to run the sample dates."
+    )
+    args = argparser.parse_args()
+
+    dateCount = len(SAMPLE_DATES) * args.number
+    print(f"\nformatting {dateCount} dates ...\n")
+    for name, function in (
+        ("legacy formatDate", legacy_run),
+        ("formatDate, cold cache", uncached_run),
+        ("formatDate, warm cache", cached_run),
+    ):
+        seconds = timeit.timeit(
+            functools.partial(function, SAMPLE_DATES), number=args.number
+        )
+        print(f"{name:<25} {seconds / dateCount * 1000000:8.2f} us per date")
+    print()
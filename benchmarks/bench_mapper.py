@@ -0,0 +1,281 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import timeit
+from collections import Counter
+
+import generate_sdn
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+srcPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, srcPath)
+import ofac_mapper  # noqa: E402  pylint: disable=wrong-import-position
+import ofac_io  # noqa: E402  pylint: disable=wrong-import-position
+import ofac_records  # noqa: E402  pylint: disable=wrong-import-position
+import ofac_sdn  # noqa: E402  pylint: disable=wrong-import-position
+import ofac_stats  # noqa: E402  pylint: disable=wrong-import-position
+
+STAGES = ("parse", "extract", "map", "serialize", "write")
+SAMPLE_SIZE = 1000
+
+
+# ----------------------------------------
+def peak_rss_mb(who):
+    """peak resident memory of this process or its children, in megabytes"""
+    if not resource:
+        return None
+    peakRss = resource.getrusage(who).ru_maxrss
+    # --linux reports kilobytes, macos bytes
+    return round(peakRss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ----------------------------------------
+def run_end_to_end(inputFile, workDir, mapperArgs):
+    """time the mapper script itself, as it is run in production"""
+    shutil.copy(os.path.join(srcPath, "ofac_codes.csv"), workDir)
+    outputFile = os.path.join(workDir, "end-to-end.json")
+    startTime = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(srcPath, "ofac_mapper.py")]
+        + ["-i", inputFile, "-o", outputFile]
+        + mapperArgs,
+        cwd=workDir,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    seconds = time.perf_counter() - startTime
+    with open(outputFile, "rb") as f:
+        recordCount = sum(1 for _ in f)
+    return {
+        "records": recordCount,
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(recordCount / seconds, 1),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+# ----------------------------------------
+def run_stages(inputFile, workDir):
+    """one streaming pass over the file, timing each stage on its own"""
+    mapper = ofac_mapper.OfacMapper()
+    writer = ofac_io.OutputWriter(os.path.join(workDir, "stages.json"))
+    clock = time.perf_counter
+    timings = Counter()
+    sample = []
+    jsonLines = []
+    publishDate = ""
+    recordCount = 0
+
+    with open(inputFile, "rb") as inputHandle:
+        sdnElements = ofac_sdn.iter_sdn_elements(inputHandle)
+        while True:
+            startTime = clock()
+            sdnEntry = next(sdnElements, None)
+            parseTime = clock()
+            timings["parse"] += parseTime - startTime
+            if sdnEntry is None:
+                break
+            if sdnEntry.tag == "publishInformation":
+                publishDate = ofac_sdn.getValue(sdnEntry, "Publish_Date")
+                continue
+
+            entry = ofac_sdn.extract_sdn_entry(sdnEntry)
+            extractTime = clock()
+            jsonData = mapper.map_sdn_entry(entry, publishDate)
+            mapTime = clock()
+            timings["extract"] += extractTime - parseTime
+            timings["map"] += mapTime - extractTime
+            if not jsonData:
+                continue
+
+            jsonLines.append(json.dumps(jsonData) + "\n")
+            serializeTime = clock()
+            timings["serialize"] += serializeTime - mapTime
+            if len(jsonLines) >= ofac_sdn.WORKER_BATCH_SIZE:
+                writer.write_lines(jsonLines)
+                jsonLines = []
+                timings["write"] += clock() - serializeTime
+            recordCount += 1
+            if len(sample) < SAMPLE_SIZE:
+                sample.append(jsonData)
+
+    startTime = clock()
+    writer.write_lines(jsonLines)
+    writer.close()
+    timings["write"] += clock() - startTime
+
+    results = {
+        stage: {
+            "seconds": round(timings[stage], 3),
+            "us_per_record": round(timings[stage] / max(recordCount, 1) * 1000000, 2),
+        }
+        for stage in STAGES
+    }
+    totalSeconds = sum(timings.values())
+    results["total"] = {
+        "records": recordCount,
+        "seconds": round(totalSeconds, 3),
+        "records_per_sec": round(recordCount / totalSeconds, 1),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+    }
+    return results, mapper, sample
+
+
+# ----------------------------------------
+def run_functions(mapper, sample, workDir):
+    """the functions most likely to regress, timed on their own"""
+    dates = [
+        dateStr
+        for jsonData in sample
+        for dateStr in jsonData.get("DATE_OF_BIRTH", "").split(" | ")
+        if dateStr
+    ]
+    statPack = ofac_stats.StatCollector(True)
+    codesFile = os.path.join(workDir, "ofac_codes.csv")
+
+    def format_dates():
+        ofac_records.formatDate.cache_clear()
+        for dateStr in dates:
+            ofac_records.formatDate(dateStr)
+
+    def add_stats():
+        for jsonData in sample:
+            statPack.add_record(jsonData)
+
+    results = {}
+    for name, function, itemCount, number in (
+        ("formatDate", format_dates, len(dates), 20),
+        ("StatCollector.add_record", add_stats, len(sample), 20),
+        ("save_codes_file", lambda: mapper.save_codes_file(codesFile), 1, 5),
+    ):
+        seconds = min(timeit.repeat(function, number=number, repeat=3)) / number
+        results[name] = {
+            "calls": itemCount,
+            "us_per_call": round(seconds / max(itemCount, 1) * 1000000, 3),
+        }
+    return results
+
+
+# ----------------------------------------
+def compare_results(results, baseline, tolerance):
+    """print the change in each rate since the baseline, returning the
+    names of the ones that got slower by more than the tolerance"""
+    regressions = []
+    print(f"\n{'compared to baseline':<40} {'before':>12} {'after':>12} {'change':>8}")
+    for section, metric, higherIsBetter in (
+        ("end_to_end", "records_per_sec", True),
+        ("stages", "records_per_sec", True),
+        ("stages", "us_per_record", False),
+        ("functions", "us_per_call", False),
+    ):
+        for name, after in flatten_metric(results.get(section, {}), metric):
+            before = dict(flatten_metric(baseline.get(section, {}), metric)).get(name)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            slower = -change if higherIsBetter else change
+            flag = "  <--" if slower > tolerance else ""
+            print(f"{name:<40} {before:>12} {after:>12} {change:>7.1f}%{flag}")
+            if slower > tolerance:
+                regressions.append(name)
+    return regressions
+
+
+# ----------------------------------------
+def flatten_metric(section, metric):
+    if metric in section:
+        return [(metric, section[metric])]
+    return [
+        (f"{name} {metric}", values[metric])
+        for name, values in section.items()
+        if metric in values
+    ]
+
+
+# ----------------------------------------
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    argparser.add_argument(
+        "-i",
+        "--inputFile",
+        help="an sdn.xml file to run on instead of a generated one.",
+    )
+    argparser.add_argument(
+        "-n",
+        "--number",
+        type=int,
+        default=10000,
+        help="number of sdn entries to generate when no input file is given.",
+    )
+    argparser.add_argument(
+        "-r", "--resultsFile", help="optional json file to save the results to."
+    )
+    argparser.add_argument(
+        "--baseline",
+        help="results file from an earlier run to compare against, exits with 1 if anything got slower than the tolerance.",
+    )
+    argparser.add_argument(
+        "--tolerance",
+        type=float,
+        default=25.0,
+        help="percent slowdown allowed before a result counts as a regression.",
+    )
+    # --anything else, such as -w 4, is passed to ofac_mapper.py for the end to end run
+    args, mapperArgs = argparser.parse_known_args()
+
+    with tempfile.TemporaryDirectory() as workDir:
+        inputFile = args.inputFile
+        if not inputFile:
+            inputFile = os.path.join(workDir, "sdn-synthetic.xml")
+            print(f"\ngenerating {args.number} sdn entries ...")
+            with open(inputFile, "w", encoding="utf-8") as outputHandle:
+                generate_sdn.generate_sdn(outputHandle, args.number)
+
+        # --the end to end run goes first so its peak memory is its own
+        print(f"\nmapping {inputFile} ...\n")
+        results: dict = {
+            "input_file": args.inputFile or f"generated {args.number} entries"
+        }
+        results["end_to_end"] = run_end_to_end(inputFile, workDir, mapperArgs)
+        results["stages"], mapper, sample = run_stages(inputFile, workDir)
+        results["functions"] = run_functions(mapper, sample, workDir)
+
+    endToEnd = results["end_to_end"]
+    print(f"{'end to end':<28} {endToEnd['records_per_sec']:>10} records/sec")
+    print(f"{'':<28} {endToEnd['seconds']:>10} seconds")
+    print(f"{'':<28} {str(endToEnd['peak_rss_mb']):>10} MB peak rss\n")
+    for stage in STAGES:
+        stageResult = results["stages"][stage]
+        print(f"{stage:<28} {stageResult['us_per_record']:>10} us per record")
+    total = results["stages"]["total"]
+    print(f"{'all stages':<28} {total['records_per_sec']:>10} records/sec\n")
+    for name, functionResult in results["functions"].items():
+        print(f"{name:<28} {functionResult['us_per_call']:>10} us per call")
+
+    if args.resultsFile:
+        with open(args.resultsFile, "w") as outfile:
+            json.dump(results, outfile, indent=4)
+        print(f"\nresults written to {args.resultsFile}")
+
+    exitCode = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} results slower than the baseline!")
+            exitCode = 1
+    print()
+    sys.exit(exitCode)
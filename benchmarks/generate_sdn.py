@@ -0,0 +1,298 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import argparse
+import csv
+import random
+from xml.sax.saxutils import escape
+
+DEFAULT_CODES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "src", "ofac_codes.csv"
+)
+
+# --roughly the mix of entry types on the published list
+SDN_TYPES = (("Individual", 55), ("Entity", 38), ("Vessel", 5), ("Aircraft", 2))
+
+PROGRAMS = (
+    "SDGT",
+    "IRAN",
+    "RUSSIA-EO14024",
+    "SDNTK",
+    "CUBA",
+    "UKRAINE-EO13660",
+    "IFSR",
+    "NPWMD",
+    "GLOMAG",
+    "BALKANS",
+)
+FIRST_NAMES = (
+    "Ahmed",
+    "Maria",
+    "Juan Pablo",
+    "Olga",
+    "Mohammad",
+    "Kim",
+    "Sergei",
+    "Fatima",
+    "Luis Alberto",
+    "Yusuf",
+)
+LAST_NAMES = (
+    "ABACHA",
+    "AL-RASHID",
+    "PETROV",
+    "GARCIA LOPEZ",
+    "KIM",
+    "HOSSEINI",
+    "IVANOV",
+    "RODRIGUEZ",
+    "NASSER",
+    "CHEN",
+)
+ENTITY_WORDS = (
+    "TRADING",
+    "SHIPPING",
+    "INTERNATIONAL",
+    "HOLDINGS",
+    "PETROLEUM",
+    "BANK",
+    "INDUSTRIAL",
+    "GROUP",
+    "LOGISTICS",
+    "ENERGY",
+)
+ENTITY_SUFFIXES = ("LLC", "LTD", "S.A.", "JSC", "CO.", "FZE", "GMBH", "")
+AKA_TYPES = (("a.k.a.", 85), ("f.k.a.", 10), ("n.k.a.", 5))
+CITIES = ("Havana", "Tehran", "Moscow", "Caracas", "Dubai", "Beirut", "Panama")
+VESSEL_TYPES = ("Crude Oil Tanker", "Bulk Carrier", "General Cargo", "Container Ship")
+MONTHS = tuple("Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split())
+
+
+# ----------------------------------------
+def load_code_weights(codes_filename):
+    """return the idType and idCountry codes weighted by their record counts"""
+    codeWeights = {"idType": ([], []), "idCountry": ([], [])}
+    with open(codes_filename, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["RAW_TYPE"] in codeWeights:
+                codes, weights = codeWeights[row["RAW_TYPE"]]
+                codes.append(row["RAW_CODE"])
+                weights.append(max(int(row["RECORD_COUNT"] or 0), 1))
+    return codeWeights
+
+
+# ----------------------------------------
+def weighted(rng, choices):
+    return rng.choices([x[0] for x in choices], [x[1] for x in choices])[0]
+
+
+# ----------------------------------------
+def element(tag, value):
+    return f"<{tag}>{escape(str(value))}</{tag}>"
+
+
+# ----------------------------------------
+def random_date(rng):
+    """a date of birth in one of the shapes found on the list"""
+    year = rng.randint(1940, 2000)
+    shape = rng.random()
+    if shape < 0.55:
+        return f"{rng.randint(1, 28):02d} {rng.choice(MONTHS)} {year}"
+    if shape < 0.80:
+        return str(year)
+    if shape < 0.88:
+        return f"circa {year}"
+    if shape < 0.95:
+        return f"{year} to {year + rng.randint(1, 4)}"
+    return f"{rng.choice(MONTHS)} {year}"
+
+
+# ----------------------------------------
+def random_id_number(rng, idType):
+    if idType == "Gender":
+        return rng.choice(("Male", "Female"))
+    if idType == "Website":
+        return f"www.example{rng.randint(1, 99999)}.com"
+    if idType == "Email Address":
+        return f"info{rng.randint(1, 99999)}@example.com"
+    if idType == "Vessel Registration Identification":
+        return f"IMO {rng.randint(1000000, 9999999)}"
+    if idType.endswith("Date"):
+        return random_date(rng)
+    return f"{rng.choice('ABCDEFGHKLMNPRSTX')}{rng.randint(100000, 99999999)}"
+
+
+# ----------------------------------------
+def sdn_entry(rng, uid, codeWeights):
+    """return one sdnEntry element as a string"""
+    sdnType = weighted(rng, SDN_TYPES)
+    isPerson = sdnType == "Individual"
+    idTypes, idTypeWeights = codeWeights["idType"]
+    countries, countryWeights = codeWeights["idCountry"]
+    lines = ["  <sdnEntry>", "    " + element("uid", uid)]
+    if isPerson:
+        lines.append("    " + element("firstName", rng.choice(FIRST_NAMES)))
+        lines.append("    " + element("lastName", rng.choice(LAST_NAMES)))
+        if rng.random() < 0.1:
+            lines.append("    " + element("title", "General"))
+    else:
+        name = " ".join(rng.sample(ENTITY_WORDS, rng.randint(1, 3)))
+        suffix = rng.choice(ENTITY_SUFFIXES)
+        lines.append(
+            "    "
+            + element("lastName", f"{rng.choice(LAST_NAMES)} {name} {suffix}".strip())
+        )
+    lines.append("    " + element("sdnType", sdnType))
+    if rng.random() < 0.3:
+        lines.append(
+            "    " + element("remarks", "Linked To: " + rng.choice(LAST_NAMES))
+        )
+
+    programs = rng.sample(PROGRAMS, 1 if rng.random() < 0.8 else 2)
+    lines.append(
+        "    <programList>"
+        + "".join(element("program", x) for x in programs)
+        + "</programList>"
+    )
+
+    # --the counts of list items are skewed, most entries have few
+    idCount = min(int(rng.expovariate(0.6)), 12)
+    if idCount:
+        lines.append("    <idList>")
+        for idUid in range(idCount):
+            idType = rng.choices(idTypes, idTypeWeights)[0]
+            idFields = element("uid", uid * 100 + idUid) + element("idType", idType)
+            idFields += element("idNumber", random_id_number(rng, idType))
+            if rng.random() < 0.6:
+                idFields += element(
+                    "idCountry", rng.choices(countries, countryWeights)[0]
+                )
+            lines.append(f"      <id>{idFields}</id>")
+        lines.append("    </idList>")
+
+    akaCount = min(int(rng.expovariate(0.7)), 20)
+    if akaCount:
+        lines.append("    <akaList>")
+        for akaUid in range(akaCount):
+            akaFields = element("uid", uid * 100 + akaUid)
+            akaFields += element("type", weighted(rng, AKA_TYPES))
+            akaFields += element("category", rng.choice(("strong", "weak")))
+            if isPerson:
+                akaFields += element("firstName", rng.choice(FIRST_NAMES))
+            akaFields += element("lastName", rng.choice(LAST_NAMES))
+            lines.append(f"      <aka>{akaFields}</aka>")
+        lines.append("    </akaList>")
+
+    addressCount = min(int(rng.expovariate(0.9)), 8)
+    if addressCount:
+        lines.append("    <addressList>")
+        for addressUid in range(addressCount):
+            addressFields = element("uid", uid * 100 + addressUid)
+            if rng.random() < 0.4:
+                addressFields += element(
+                    "address1", f"{rng.randint(1, 999)} {rng.choice(ENTITY_WORDS)} St."
+                )
+            if rng.random() < 0.7:
+                addressFields += element("city", rng.choice(CITIES))
+            addressFields += element("country", rng.choice(countries))
+            lines.append(f"      <address>{addressFields}</address>")
+        lines.append("    </addressList>")
+
+    if isPerson:
+        dobs = [random_date(rng) for _ in range(1 if rng.random() < 0.85 else 2)]
+        lines.append(
+            "    <dateOfBirthList>"
+            + "".join(
+                f"<dateOfBirthItem>{element('uid', uid)}{element('dateOfBirth', x)}"
+                f"<mainEntry>true</mainEntry></dateOfBirthItem>"
+                for x in dobs
+            )
+            + "</dateOfBirthList>"
+        )
+        if rng.random() < 0.5:
+            placeOfBirth = f"{rng.choice(CITIES)}, {rng.choice(countries)}"
+            lines.append(
+                "    <placeOfBirthList><placeOfBirthItem>"
+                + element("placeOfBirth", placeOfBirth)
+                + "</placeOfBirthItem></placeOfBirthList>"
+            )
+        if rng.random() < 0.4:
+            lines.append(
+                "    <nationalityList><nationality>"
+                + element("country", rng.choice(countries))
+                + "</nationality></nationalityList>"
+            )
+        if rng.random() < 0.2:
+            lines.append(
+                "    <citizenshipList><citizenship>"
+                + element("country", rng.choice(countries))
+                + "</citizenship></citizenshipList>"
+            )
+
+    if sdnType == "Vessel":
+        vesselFields = element("callSign", f"9H{rng.randint(1000, 9999)}")
+        vesselFields += element("vesselType", rng.choice(VESSEL_TYPES))
+        vesselFields += element("vesselFlag", rng.choice(countries))
+        vesselFields += element("tonnage", rng.randint(1000, 300000))
+        vesselFields += element("grossRegisteredTonnage", rng.randint(1000, 300000))
+        if rng.random() < 0.5:
+            vesselFields += element("vesselOwner", rng.choice(LAST_NAMES) + " SHIPPING")
+        lines.append(f"    <vesselInfo>{vesselFields}</vesselInfo>")
+
+    lines.append("  </sdnEntry>")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------
+def generate_sdn(outputHandle, entryCount, seed=0, codes_filename=DEFAULT_CODES_FILE):
+    """write a synthetic sdn.xml with entryCount entries, one at a time so any
+    size can be generated in flat memory"""
+    rng = random.Random(seed)
+    codeWeights = load_code_weights(codes_filename)
+    outputHandle.write(
+        '<?xml version="1.0" standalone="yes"?>\n'
+        '<sdnList xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xmlns="https://sanctionslistservice.ofac.treas.gov/api/'
+        'PublicationPreview/exports/XSD">\n'
+        "  <publishInformation>\n"
+        "    <Publish_Date>01/02/2026</Publish_Date>\n"
+        f"    <Record_Count>{entryCount}</Record_Count>\n"
+        "  </publishInformation>\n"
+    )
+    for uid in range(1, entryCount + 1):
+        outputHandle.write(sdn_entry(rng, uid, codeWeights))
+    outputHandle.write("</sdnList>\n")
+
+
+# ----------------------------------------
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    argparser.add_argument(
+        "-n", "--number", type=int, default=1000, help="sdnEntry elements to generate."
+    )
+    argparser.add_argument(
+        "-o", "--outputFile", default="sdn-synthetic.xml", help="output filename."
+    )
+    argparser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="random seed, the same seed and number always give the same file.",
+    )
+    argparser.add_argument(
+        "-c",
+        "--codesFile",
+        default=DEFAULT_CODES_FILE,
+        help="codes file to draw the id types and countries from.",
+    )
+    args = argparser.parse_args()
+
+    if args.outputFile == "-":
+        generate_sdn(sys.stdout, args.number, args.seed, args.codesFile)
+    else:
+        with open(args.outputFile, "w", encoding="utf-8") as outputHandle:
+            generate_sdn(outputHandle, args.number, args.seed, args.codesFile)
+        print(f"\n{args.number} sdn entries written to {args.outputFile}\n")
@@ -0,0 +1,407 @@
+import xml.etree.ElementTree as etree
+import re
+import calendar
+from collections import defaultdict
+
+from ofac_metrics import TimedReader
+from ofac_sdn import (
+    READ_BLOCK_SIZE,
+    SDN_ENTRY_LISTS,
+    XML_ROOT_START,
+    extract_sdn_entry,
+    getText,
+    getValue,
+    iter_sdn_elements,
+    SdnAddress,
+    SdnAka,
+    SdnEntry,
+    SdnId,
+    SdnVesselInfo,
+    strip_namespaces,
+)
+
+# --advanced xml (SDN_ADVANCED.XML, CONS_ADVANCED.XML) sections and features
+XML_SNIFF_SIZE = 4096
+SANCTIONS_ENTRIES_START = re.compile(rb"<(?:[\w.-]+:)?SanctionsEntries[\s>]")
+SANCTIONS_ENTRIES_END = re.compile(rb"</(?:[\w.-]+:)?SanctionsEntries\s*>")
+ADVANCED_SCAN_OVERLAP = 64
+ADVANCED_LOCATION_PARTS = {
+    "ADDRESS1": "address1",
+    "ADDRESS2": "address2",
+    "ADDRESS3": "address3",
+    "CITY": "city",
+    "STATE/PROVINCE": "stateOrProvince",
+    "POSTAL CODE": "postalCode",
+}
+ADVANCED_VALUE_LISTS = {
+    "Place of Birth": "placesOfBirth",
+    "Nationality Country": "nationalities",
+    "Citizenship Country": "citizenships",
+}
+ADVANCED_VESSEL_FEATURES = {
+    "Vessel Call Sign": "callSign",
+    "Vessel Type": "vesselType",
+    "Vessel Flag": "vesselFlag",
+    "Vessel Owner": "vesselOwner",
+    "Vessel Tonnage": "tonnage",
+    "Vessel Gross Registered Tonnage": "grossRegisteredTonnage",
+}
+
+
+# ----------------------------------------
+class AdvancedIndex:
+    """the reference sections of an advanced xml file, indexed by their IDs so
+    the parties can be resolved as they stream past"""
+
+    def __init__(self):
+        self.values = defaultdict(dict)
+        self.partySubTypes = {}
+        self.locations = {}
+        self.documents = defaultdict(list)
+        self.sanctions = defaultdict(list)
+
+    def value(self, valueTag, valueId):
+        """the text of a reference value, such as value("Country", "11")"""
+        return self.values[valueTag].get(valueId, "")
+
+    def add_value_set(self, valueSet):
+        for item in valueSet:
+            self.values[item.tag][item.get("ID")] = getText(item)
+            if item.tag == "PartySubType":
+                self.partySubTypes[item.get("ID")] = (
+                    getText(item),
+                    item.get("PartyTypeID"),
+                )
+
+    def add_location(self, location):
+        addressFields = {}
+        for child in location:
+            if child.tag == "LocationCountry":
+                addressFields["country"] = self.value("Country", child.get("CountryID"))
+            elif child.tag == "LocationPart":
+                partType = self.value("LocPartType", child.get("LocPartTypeID"))
+                field = ADVANCED_LOCATION_PARTS.get(partType)
+                if field:
+                    addressFields[field] = getValue(child, "LocationPartValue/Value")
+        self.locations[location.get("ID")] = SdnAddress(**addressFields)
+
+    def add_document(self, document):
+        self.documents[document.get("IdentityID")].append(
+            SdnId(
+                idType=self.value("IDRegDocType", document.get("IDRegDocTypeID")),
+                idNumber=getValue(document, "IDRegistrationNo"),
+                idCountry=self.value("Country", document.get("IssuedBy-CountryID")),
+            )
+        )
+
+    def add_sanctions_entry(self, sanctionsEntry):
+        for measure in sanctionsEntry.iter("SanctionsMeasure"):
+            self.sanctions[sanctionsEntry.get("ProfileID")].append(
+                (measure.get("SanctionsTypeID"), getValue(measure, "Comment"))
+            )
+
+    def programs(self, profileId):
+        return [
+            comment
+            for sanctionsTypeId, comment in self.sanctions.get(profileId, ())
+            if comment and self.value("SanctionsType", sanctionsTypeId) == "Program"
+        ]
+
+
+# ----------------------------------------
+def advanced_date(dateElement):
+    """(year, month, day) of a From or To element, None if it has no year"""
+    if dateElement is None or not dateElement.findtext("Year"):
+        return None
+    return (
+        int(dateElement.findtext("Year")),
+        int(dateElement.findtext("Month") or 1),
+        int(dateElement.findtext("Day") or 1),
+    )
+
+
+# ----------------------------------------
+def advanced_date_period(datePeriod):
+    """a DatePeriod written the way the sdn.xml file has it, such as 12 Jan 1955,
+    Mar 1962, 1961, 1955 to 1958 or circa 1960"""
+    start = datePeriod.find("Start")
+    end = datePeriod.find("End")
+    fromDate = advanced_date(start.find("From") if start is not None else None)
+    toDate = advanced_date(end.find("To") if end is not None else None) or fromDate
+    if not fromDate:
+        return ""
+    (fromYear, fromMonth, fromDay), (toYear, toMonth, toDay) = fromDate, toDate
+    monthName = calendar.month_abbr
+    if fromDate == toDate:
+        dateStr = f"{fromDay:02d} {monthName[fromMonth]} {fromYear}"
+    elif (fromMonth, fromDay, toMonth, toDay) == (1, 1, 12, 31):
+        dateStr = str(fromYear) if fromYear == toYear else f"{fromYear} to {toYear}"
+    elif fromDay == 1 and (fromYear, fromMonth) == (toYear, toMonth) and toDay >= 28:
+        dateStr = f"{monthName[fromMonth]} {fromYear}"
+    else:
+        dateStr = (
+            f"{fromDay:02d} {monthName[fromMonth]} {fromYear} to"
+            f" {toDay:02d} {monthName[toMonth]} {toYear}"
+        )
+    return "circa " + dateStr if start.get("Approximate") == "true" else dateStr
+
+
+# ----------------------------------------
+def advanced_alias_names(alias, namePartTypes, isIndividual, index):
+    """(last name, first name) of an alias, from its latin script name if any"""
+    documentedNames = alias.findall("DocumentedName")
+    if not documentedNames:
+        return "", ""
+    documentedName = documentedNames[0]
+    for candidate in documentedNames:
+        namePart = candidate.find("DocumentedNamePart/NamePartValue")
+        if (
+            namePart is not None
+            and index.value("Script", namePart.get("ScriptID")) == "Latin"
+        ):
+            documentedName = candidate
+            break
+
+    lastNames, firstNames = [], []
+    for namePart in documentedName.iter("NamePartValue"):
+        partType = namePartTypes.get(namePart.get("NamePartGroupID"), "")
+        if isIndividual and partType != "Last Name":
+            firstNames.append(getText(namePart))
+        else:
+            lastNames.append(getText(namePart))
+    return " ".join(filter(None, lastNames)), " ".join(filter(None, firstNames))
+
+
+# ----------------------------------------
+def extract_distinct_party(party, index):
+    """resolve a DistinctParty element against the index into an SdnEntry record"""
+    fields = {field: [] for field in SDN_ENTRY_LISTS}
+    fields["uid"] = party.get("FixedRef", "")
+    fields["remarks"] = getValue(party, "Comment")
+    profile = party.find("Profile")
+    if profile is None:
+        return SdnEntry(**fields)
+
+    subType, partyTypeId = index.partySubTypes.get(
+        profile.get("PartySubTypeID"), ("", "")
+    )
+    if subType in ("Vessel", "Aircraft"):
+        fields["sdnType"] = subType
+    else:
+        fields["sdnType"] = index.value("PartyType", partyTypeId)
+    isIndividual = fields["sdnType"] == "Individual"
+
+    for identity in profile.iter("Identity"):
+        namePartTypes = {
+            group.get("ID"): index.value("NamePartType", group.get("NamePartTypeID"))
+            for group in identity.iter("NamePartGroup")
+        }
+        for alias in identity.iter("Alias"):
+            lastName, firstName = advanced_alias_names(
+                alias, namePartTypes, isIndividual, index
+            )
+            if alias.get("Primary") == "true" and not (
+                fields.get("lastName") or fields.get("firstName")
+            ):
+                fields["lastName"], fields["firstName"] = lastName, firstName
+            else:
+                fields["akas"].append(
+                    SdnAka(
+                        type=index.value("AliasType", alias.get("AliasTypeID")).lower(),
+                        lastName=lastName,
+                        firstName=firstName,
+                    )
+                )
+        fields["ids"].extend(index.documents.get(identity.get("ID"), ()))
+
+    vesselFields = {}
+    for feature in profile.iter("Feature"):
+        featureType = index.value("FeatureType", feature.get("FeatureTypeID"))
+        for version in feature.iter("FeatureVersion"):
+            add_feature_version(fields, vesselFields, featureType, version, index)
+    if vesselFields:
+        fields["vesselInfo"] = SdnVesselInfo(**vesselFields)
+
+    fields["programs"] = index.programs(profile.get("ID"))
+    return SdnEntry(**fields)
+
+
+# ----------------------------------------
+def add_feature_version(fields, vesselFields, featureType, version, index):
+    """add a feature to the SdnEntry field the sdn.xml file would have put it in,
+    or to the vessel info fields"""
+    value = ""
+    detail = version.find("VersionDetail")
+    if detail is not None:
+        value = getText(detail) or index.value(
+            "DetailReference", detail.get("DetailReferenceID")
+        )
+    versionLocation = version.find("VersionLocation")
+    location = versionLocation is not None and index.locations.get(
+        versionLocation.get("LocationID")
+    )
+    datePeriod = version.find("DatePeriod")
+    if not value and datePeriod is not None:
+        value = advanced_date_period(datePeriod)
+
+    if featureType == "Location":
+        if location:
+            fields["addresses"].append(location)
+    elif featureType == "Birthdate":
+        if value:
+            fields["datesOfBirth"].append(value)
+    elif featureType in ADVANCED_VALUE_LISTS:
+        value = value or (location.country if location else "")
+        if value:
+            fields[ADVANCED_VALUE_LISTS[featureType]].append(value)
+    elif featureType == "Title":
+        fields["title"] = value
+    elif featureType in ADVANCED_VESSEL_FEATURES:
+        vesselFields[ADVANCED_VESSEL_FEATURES[featureType]] = value
+    else:
+        # --everything else was in the idList of the sdn.xml file
+        fields["ids"].append(
+            SdnId(
+                idType=featureType,
+                idNumber=value or (location.country if location else ""),
+            )
+        )
+
+
+# ----------------------------------------
+def read_sanctions_entries(inputHandle, index):
+    """find the SanctionsEntries section with a byte scan and parse just it
+
+    the programs are only listed after all the parties, so they are read ahead
+    of the stream and the file is then rewound; returns False when the input
+    cannot be rewound
+    """
+    if not (hasattr(inputHandle, "seekable") and inputHandle.seekable()):
+        return False
+    startPos = inputHandle.tell()
+    parser = None
+    buffer = b""
+    while True:
+        block = inputHandle.read(READ_BLOCK_SIZE)
+        buffer += block
+        if parser is None:
+            sectionStart = SANCTIONS_ENTRIES_START.search(buffer)
+            if not sectionStart:
+                buffer = buffer[-ADVANCED_SCAN_OVERLAP:]
+                if block:
+                    continue
+                break
+            buffer = buffer[sectionStart.start() :]
+            parser = etree.XMLPullParser(events=("end",))
+
+        # --hold back the tail in case the end tag is split across blocks
+        sectionEnd = SANCTIONS_ENTRIES_END.search(buffer)
+        if sectionEnd:
+            parser.feed(buffer[: sectionEnd.end()])
+        elif block:
+            parser.feed(buffer[:-ADVANCED_SCAN_OVERLAP])
+            buffer = buffer[-ADVANCED_SCAN_OVERLAP:]
+        for _, element in parser.read_events():
+            if element.tag[0] == "{":
+                element.tag = element.tag.rpartition("}")[2]
+            if element.tag == "SanctionsEntry":
+                strip_namespaces(element)
+                index.add_sanctions_entry(element)
+                element.clear()
+        if sectionEnd or not block:
+            break
+
+    inputHandle.seek(startPos)
+    return True
+
+
+# ----------------------------------------
+def iter_advanced_entries(inputHandle, timer=None):
+    """stream the DistinctParty elements of an advanced xml file as SdnEntry
+    records, indexing the reference sections that come before them"""
+    index = AdvancedIndex()
+    if not read_sanctions_entries(inputHandle, index):
+        print("\nthe input cannot be rewound, the programs will not be mapped\n")
+    if timer:
+        inputHandle = TimedReader(inputHandle, timer)
+        timer.restart()
+
+    publishDate = ""
+    xmlRoot = section = None
+    depth = 0
+    for event, element in etree.iterparse(inputHandle, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                xmlRoot = element
+            elif depth == 2:
+                section = element
+                section.tag = section.tag.rpartition("}")[2]
+            continue
+        depth -= 1
+
+        # --name spaces not needed and can mess up the tag lookups
+        if element.tag[0] == "{":
+            element.tag = element.tag.rpartition("}")[2]
+
+        if depth == 1:
+            if element.tag == "DateOfIssue":
+                publishDate = "{1:0>2}/{2:0>2}/{0}".format(
+                    *(getValue(element, x) for x in ("Year", "Month", "Day"))
+                )
+            # --release each section once it has been read
+            xmlRoot.clear()
+        elif depth == 2 and section.tag != "DateOfIssue":
+            if timer:
+                timer.mark("parse")
+            tag = element.tag
+            if tag == "DistinctParty":
+                entry = extract_distinct_party(element, index)
+                if timer:
+                    timer.mark("extract")
+                yield publishDate, entry
+            elif tag == "Location":
+                index.add_location(element)
+            elif tag == "IDRegDocument":
+                index.add_document(element)
+            elif section.tag == "ReferenceValueSets":
+                index.add_value_set(element)
+            if timer:
+                timer.mark("index")
+            section.clear()
+
+
+# ----------------------------------------
+def is_advanced_xml(inputHandle):
+    """true when the input is in the advanced xml schema rather than sdn.xml"""
+    if hasattr(inputHandle, "peek"):
+        xmlHead = inputHandle.peek(XML_SNIFF_SIZE)[:XML_SNIFF_SIZE]
+    elif hasattr(inputHandle, "seekable") and inputHandle.seekable():
+        startPos = inputHandle.tell()
+        xmlHead = inputHandle.read(XML_SNIFF_SIZE)
+        inputHandle.seek(startPos)
+    else:
+        return False
+    rootStart = XML_ROOT_START.search(xmlHead)
+    return bool(rootStart) and rootStart.group(1).endswith(b"Sanctions")
+
+
+# ----------------------------------------
+def iter_sdn_entries(inputHandle, timer=None):
+    """stream (publish date, SdnEntry) from either the sdn.xml or advanced xml schema"""
+    if is_advanced_xml(inputHandle):
+        yield from iter_advanced_entries(inputHandle, timer)
+        return
+    if timer:
+        inputHandle = TimedReader(inputHandle, timer)
+        timer.restart()
+
+    publishDate = ""
+    for sdnEntry in iter_sdn_elements(inputHandle, timer):
+        if sdnEntry.tag == "publishInformation":
+            publishDate = getValue(sdnEntry, "Publish_Date")
+            continue
+        entry = extract_sdn_entry(sdnEntry)
+        if timer:
+            timer.mark("extract")
+        yield publishDate, entry
@@ -0,0 +1,170 @@
+import argparse
+
+from ofac_metrics import METRICS_INTERVAL
+from ofac_io import OUTPUT_BUFFER_SIZE
+from ofac_cache import PARSE_CACHE_SIZE
+
+
+# ----------------------------------------
+def mapper_argparser():
+    """the command line options of ofac_mapper.py"""
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-i",
+        "--inputFile",
+        dest="inputFile",
+        type=str,
+        default=None,
+        help="an sdn.xml or SDN_ADVANCED.XML file downloaded from https://www.treasury.gov/ofac/downloads, plain or as .gz, .zip or .zst, - to read it from stdin, or a directory or quoted glob pattern of them to map as a batch.",
+    )
+    argparser.add_argument(
+        "-o",
+        "--outputFile",
+        dest="outputFile",
+        type=str,
+        help="output filename, defaults to input file name with a .json extension, or stdout when reading from stdin. For a batch, a directory for one output per input or a file name for one combined output.",
+    )
+    argparser.add_argument(
+        "-l",
+        "--logFile",
+        dest="logFile",
+        type=str,
+        help="optional statistics filename in json format.",
+    )
+    argparser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=1,
+        help="number of processes to map with, defaults to 1. A batch maps a whole file in each process.",
+    )
+    argparser.add_argument(
+        "-s",
+        "--stateFile",
+        dest="stateFile",
+        type=str,
+        help="optional file of record hashes kept between runs, when it exists only new and changed records are written.",
+    )
+    argparser.add_argument(
+        "-d",
+        "--deleteFile",
+        dest="deleteFile",
+        type=str,
+        help="file for the records to delete when a state file is used, defaults to the output file name, less its .json and compression extensions, with -deletes.json added.",
+    )
+    argparser.add_argument(
+        "-b",
+        "--bufferSize",
+        dest="bufferSize",
+        type=int,
+        default=OUTPUT_BUFFER_SIZE // 1024,
+        help="kilobytes to buffer before each write to the output file, defaults to 1024. Output files ending in .gz or .zst are compressed.",
+    )
+    argparser.add_argument(
+        "--shardSize",
+        dest="shardSize",
+        type=int,
+        default=0,
+        help="optional number of records per output file, numbering each file such as sdn-00001.json.",
+    )
+    argparser.add_argument(
+        "--async",
+        dest="asyncPipeline",
+        action="store_true",
+        default=False,
+        help="overlap parsing, mapping and writing in an asyncio pipeline. Implied when the output file is - (stdout), tcp://host:port or http://host:port/path.",
+    )
+    argparser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        default=False,
+        help="time each stage of the run and report the throughput and memory every --metricsInterval seconds. The results are added to the statistics file.",
+    )
+    argparser.add_argument(
+        "--metricsFile",
+        dest="metricsFile",
+        type=str,
+        help="optional file for the --profile results, in prometheus text format when it ends in .prom and json otherwise. Implies --profile.",
+    )
+    argparser.add_argument(
+        "--metricsInterval",
+        dest="metricsInterval",
+        type=float,
+        default=METRICS_INTERVAL,
+        help="seconds between the --profile progress reports, defaults to 10.",
+    )
+    argparser.add_argument(
+        "--cProfileFile",
+        dest="cProfileFile",
+        type=str,
+        help="optional file to dump cProfile stats to, view them with python -m pstats. With --workers only the main process is profiled.",
+    )
+    argparser.add_argument(
+        "--tracemallocFile",
+        dest="tracemallocFile",
+        type=str,
+        help="optional text file for the source lines that allocated the most memory, as traced by tracemalloc.",
+    )
+    argparser.add_argument(
+        "--cacheDir",
+        dest="cacheDir",
+        type=str,
+        help="optional directory to keep the parsed entries of each input file in, so mapping the same file again skips the xml parse.",
+    )
+    argparser.add_argument(
+        "--cacheSize",
+        dest="cacheSize",
+        type=int,
+        default=PARSE_CACHE_SIZE,
+        help="megabytes the --cacheDir may hold before the least recently used files are removed, defaults to 1024.",
+    )
+    argparser.add_argument(
+        "-x",
+        "--screenFile",
+        dest="screenFile",
+        type=str,
+        help="optional screening index file to write of the records' names, name words and id numbers, to look up with ofac_screen.py.",
+    )
+    argparser.add_argument(
+        "--mmap",
+        dest="mmapInput",
+        action="store_true",
+        default=False,
+        help="read an uncompressed input file through mmap rather than read calls.",
+    )
+    argparser.add_argument(
+        "-r",
+        "--reviewFile",
+        dest="reviewFile",
+        type=str,
+        help="optional json file listing the codes in ofac_codes.csv still to be reviewed, new ones first, with example values from this run.",
+    )
+    argparser.add_argument(
+        "--rejectsFile",
+        dest="rejectsFile",
+        type=str,
+        help="optional file to validate every record into: those missing DATA_SOURCE, RECORD_ID or a name, or with a badly formed date, are written here with the reasons instead of to the output.",
+    )
+    argparser.add_argument(
+        "--canonical",
+        dest="canonical",
+        action="store_true",
+        default=False,
+        help="write each record with its keys sorted, its lists in a fixed order and no empty values, so unchanged records are byte for byte the same from run to run.",
+    )
+    argparser.add_argument(
+        "--hashField",
+        dest="hashField",
+        action="store_true",
+        default=False,
+        help="add a RECORD_HASH of each record's content, not counting its PUBLISH_DATE, to the record.",
+    )
+    argparser.add_argument(
+        "--offsetsFile",
+        dest="offsetsFile",
+        type=str,
+        help="optional tab separated file of each record's RECORD_ID, content hash, output file, byte offset and length.",
+    )
+    return argparser
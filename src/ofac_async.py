@@ -0,0 +1,267 @@
+import sys
+import re
+import asyncio
+import threading
+
+from ofac_metrics import StageTimer
+from ofac_sdn import WORKER_BATCH_SIZE
+from ofac_io import OUTPUT_BUFFER_SIZE, OutputWriter
+from ofac_run import RunContext
+
+# --sdn entries per queued batch and batches held between stages with --async
+PIPELINE_BATCH_SIZE = 100
+PIPELINE_QUEUE_SIZE = 8
+SINK_URL = re.compile(r"^(tcp|http)://([^:/]+)(?::(\d+))?(/.*)?$")
+
+
+# ----------------------------------------
+class AsyncFileSink:
+    """async sink writing through an OutputWriter on the default executor"""
+
+    def __init__(self, fileName, bufferSize=OUTPUT_BUFFER_SIZE, shardSize=0):
+        self.writer = OutputWriter(fileName, bufferSize, shardSize)
+        self.fileNames = self.writer.fileNames
+
+    async def open(self):
+        pass
+
+    async def write_lines(self, jsonLines):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.writer.write_lines, jsonLines)
+
+    async def close(self):
+        self.writer.close()
+
+
+# ----------------------------------------
+class AsyncStdoutSink:
+    """async sink writing json lines to stdout"""
+
+    fileNames: list[str] = []
+
+    async def open(self):
+        pass
+
+    async def write_lines(self, jsonLines):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, sys.__stdout__.buffer.write, "".join(jsonLines).encode("utf-8")
+        )
+
+    async def close(self):
+        sys.__stdout__.buffer.flush()
+
+
+# ----------------------------------------
+class AsyncTcpSink:
+    """async sink streaming json lines to a tcp socket, waiting on the
+    socket to drain so a slow reader holds back the whole pipeline"""
+
+    fileNames: list[str] = []
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.writer = None
+
+    async def open(self):
+        _, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def write_lines(self, jsonLines):
+        self.writer.write("".join(jsonLines).encode("utf-8"))
+        await self.writer.drain()
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+
+# ----------------------------------------
+class AsyncHttpSink:
+    """async sink posting each batch of json lines to an http endpoint as
+    application/x-ndjson over a kept-alive connection"""
+
+    fileNames: list[str] = []
+
+    def __init__(self, host, port, path):
+        self.host = host
+        self.port = port
+        self.path = path or "/"
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def write_lines(self, jsonLines):
+        if not self.writer:
+            await self.open()
+        body = "".join(jsonLines).encode("utf-8")
+        header = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/x-ndjson\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(header.encode("ascii") + body)
+        await self.writer.drain()
+
+        # --wait for the response so the endpoint paces the pipeline
+        statusLine = await self.reader.readline()
+        statusParts = statusLine.decode("latin-1").split(None, 2)
+        if len(statusParts) < 2 or not statusParts[1].startswith("2"):
+            raise IOError(f"http post failed: {statusLine.decode('latin-1').strip()}")
+        contentLength = 0
+        keepAlive = statusParts[0] != "HTTP/1.0"
+        while True:
+            headerLine = (await self.reader.readline()).decode("latin-1").strip()
+            if not headerLine:
+                break
+            name, _, value = headerLine.partition(":")
+            if name.lower() == "content-length":
+                contentLength = int(value)
+            elif name.lower() == "connection":
+                keepAlive = value.strip().lower() != "close"
+        if contentLength:
+            await self.reader.readexactly(contentLength)
+        if not keepAlive:
+            await self.close()
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.reader, self.writer = None, None
+
+
+# ----------------------------------------
+def open_async_sink(target, bufferSize=OUTPUT_BUFFER_SIZE, shardSize=0):
+    """return the sink for - (stdout), tcp://host:port, http://host:port/path
+    or an output file name, raising ValueError for a tcp url without a port"""
+    if target == "-":
+        return AsyncStdoutSink()
+    match = SINK_URL.match(target)
+    if not match:
+        return AsyncFileSink(target, bufferSize, shardSize)
+    scheme, host, port, path = match.groups()
+    if scheme == "tcp":
+        if not port:
+            raise ValueError(f"{target} needs a port, such as tcp://{host}:8250")
+        return AsyncTcpSink(host, int(port))
+    return AsyncHttpSink(host, int(port or 80), path)
+
+
+# ----------------------------------------
+def parse_sdn_batches(mapper, inputHandle, putBatch, stopEvent, timer):
+    """parse thread: hand batches of (publish date, SdnEntry) to putBatch, which
+    blocks while the queue is full, and then None"""
+    batch = []
+    try:
+        for publishDate, entry in mapper.iter_entries(
+            inputHandle, timer if timer.enabled else None
+        ):
+            batch.append((publishDate, entry))
+            if len(batch) >= PIPELINE_BATCH_SIZE:
+                if stopEvent.is_set():
+                    return
+                putBatch(batch)
+                timer.mark("parse wait")
+                batch = []
+        if batch and not stopEvent.is_set():
+            putBatch(batch)
+    finally:
+        # --always tell the mapper the parse is over, even on an xml error
+        if not stopEvent.is_set():
+            putBatch(None)
+
+
+# ----------------------------------------
+async def map_sdn_batches(mapper, entryQueue, lineQueue, runContext):
+    """map stage: turn each batch of parsed entries into json lines"""
+    entryCount = 0
+    while True:
+        batch = await entryQueue.get()
+        if batch is None:
+            break
+        mapper.timer.restart()
+        jsonRecords = []
+        for publishDate, entry in batch:
+            jsonData = mapper.map_sdn_entry(entry, publishDate)
+            entryCount += 1
+            if entryCount % WORKER_BATCH_SIZE == 0:
+                mapper.fold_code_values()
+            if jsonData:
+                jsonRecords.append(mapper.serialize_record(jsonData))
+        jsonRecords = runContext.route_records(jsonRecords, mapper.timer)
+        if jsonRecords:
+            await lineQueue.put([x.jsonLine for x in jsonRecords])
+    await lineQueue.put(None)
+
+
+# ----------------------------------------
+async def write_sink_batches(sink, lineQueue, runContext, timer):
+    """sink stage: write each batch of json lines as it arrives"""
+    await sink.open()
+    try:
+        while True:
+            jsonLines = await lineQueue.get()
+            if jsonLines is None:
+                break
+            timer.restart()
+            await sink.write_lines(jsonLines)
+            timer.mark("write")
+            runContext.add_written(len(jsonLines))
+    finally:
+        await sink.close()
+
+
+# ----------------------------------------
+async def run_pipeline(
+    mapper, inputHandle, sink, runContext=None, queueSize=PIPELINE_QUEUE_SIZE
+):
+    """stream the sdn file through parse, map and sink stages joined by bounded
+    queues, returning the counts of records written, left unchanged and rejected"""
+    if runContext is None:
+        runContext = RunContext()
+    loop = asyncio.get_running_loop()
+    entryQueue = asyncio.Queue(queueSize)
+    lineQueue = asyncio.Queue(queueSize)
+    stopEvent = threading.Event()
+
+    def put_entries(batch):
+        asyncio.run_coroutine_threadsafe(entryQueue.put(batch), loop).result()
+
+    # --the stages overlap, so each keeps its own timer
+    parseTimer = StageTimer(mapper.timer.enabled)
+    sinkTimer = StageTimer(mapper.timer.enabled)
+    parseTask = loop.run_in_executor(
+        None,
+        parse_sdn_batches,
+        mapper,
+        inputHandle,
+        put_entries,
+        stopEvent,
+        parseTimer,
+    )
+    mapTask = asyncio.ensure_future(
+        map_sdn_batches(mapper, entryQueue, lineQueue, runContext)
+    )
+    sinkTask = asyncio.ensure_future(
+        write_sink_batches(sink, lineQueue, runContext, sinkTimer)
+    )
+    try:
+        await asyncio.gather(parseTask, mapTask, sinkTask)
+    except BaseException:
+        # --unblock the parse thread so it can see the stop and exit
+        stopEvent.set()
+        mapTask.cancel()
+        sinkTask.cancel()
+        while not entryQueue.empty():
+            entryQueue.get_nowait()
+        await asyncio.gather(parseTask, mapTask, sinkTask, return_exceptions=True)
+        raise
+    mapper.timer.merge(parseTimer.take())
+    mapper.timer.merge(sinkTimer.take())
+    return runContext.counts
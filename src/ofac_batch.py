@@ -0,0 +1,87 @@
+import xml.etree.ElementTree as etree
+from typing import NamedTuple, Optional
+
+from ofac_io import INPUT_DECODE_ERRORS, open_sdn_input, OutputWriter
+
+# --the mapper a worker process was started with, set by init_mapper_worker
+workerState: dict = {}
+
+
+# ----------------------------------------
+class BatchJob(NamedTuple):
+    """a batch input file and where and how to write its records"""
+
+    inputFile: str
+    outputFile: str
+    bufferSize: int
+    shardSize: int
+
+
+# ----------------------------------------
+class BatchFileResult(NamedTuple):
+    """how a batch file went, with the stats of the worker that mapped it; the
+    stats are None when it was mapped by the main mapper"""
+
+    inputFile: str
+    rowCnt: int
+    errorMessage: Optional[str]
+    partialStats: object = None
+    codeStats: object = None
+    stageSeconds: object = None
+
+
+# ----------------------------------------
+def init_mapper_worker(mapper):
+    """give a worker process its own mapper, made by OfacMapper.worker_mapper"""
+    workerState["mapper"] = mapper
+
+
+# ----------------------------------------
+def map_sdn_chunk(publishDate, xmlChunk):
+    return workerState["mapper"].map_chunk(publishDate, xmlChunk)
+
+
+# ----------------------------------------
+def map_sdn_file(mapper, inputFile, outputFile, bufferSize, shardSize):
+    """map one whole sdn file to its own output, returning the records written"""
+    rowCnt = 0
+    outputHandle = OutputWriter(outputFile, bufferSize, shardSize)
+    try:
+        with open_sdn_input(inputFile) as inputHandle:
+            for jsonRecords in mapper.iter_serialized(inputHandle):
+                outputHandle.write_lines([x.jsonLine for x in jsonRecords])
+                mapper.timer.mark("write")
+                rowCnt += len(jsonRecords)
+    finally:
+        outputHandle.close()
+    return rowCnt
+
+
+# ----------------------------------------
+def map_sdn_file_worker(batchJob):
+    """batch worker: map a file, handing back its stats instead of the records"""
+    workerMapper = workerState["mapper"]
+    try:
+        rowCnt = map_sdn_file(workerMapper, *batchJob)
+        errorMessage = None
+    except (etree.ParseError, IOError, OSError) + INPUT_DECODE_ERRORS as err:
+        rowCnt, errorMessage = 0, str(err)
+    return BatchFileResult(
+        batchJob.inputFile,
+        rowCnt,
+        errorMessage,
+        workerMapper.statPack.take(),
+        workerMapper.take_code_stats(),
+        workerMapper.timer.take(),
+    )
+
+
+# ----------------------------------------
+def run_batch_job_in_process(mapper, batchJob):
+    """map a batch file with the main mapper, its stats go straight onto it"""
+    try:
+        return BatchFileResult(
+            batchJob.inputFile, map_sdn_file(mapper, *batchJob), None
+        )
+    except (etree.ParseError, IOError, OSError) + INPUT_DECODE_ERRORS as err:
+        return BatchFileResult(batchJob.inputFile, 0, str(err))
@@ -0,0 +1,151 @@
+import os
+import re
+import hashlib
+import pickle
+import io
+
+from ofac_sdn import READ_BLOCK_SIZE
+from ofac_advanced import XML_SNIFF_SIZE, iter_sdn_entries
+
+# --parsed entries per pickle in a parse cache file, the default megabytes the
+# --cache may hold and a version to bump whenever the SdnEntry records change
+PARSE_CACHE_BATCH = 1000
+PARSE_CACHE_SIZE = 1024
+PARSE_CACHE_VERSION = 3
+PUBLISH_DATE_TAG = re.compile(
+    rb"<(?:[\w.-]+:)?(Publish_Date|DateOfIssue)>(.*?)</(?:[\w.-]+:)?\1>", re.DOTALL
+)
+
+
+# ----------------------------------------
+class ParseCache:
+    """parsed entries kept on disk between runs, keyed on the input's content
+    hash and publish date, so a rerun skips the xml parse and only maps codes"""
+
+    def __init__(self, cacheDir, maxMegabytes=PARSE_CACHE_SIZE):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxMegabytes * 1024 * 1024
+        self.lastKey = (None, None)
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def cache_key(self, inputHandle):
+        """the content hash and publish date of a file, or None for a stream"""
+        try:
+            fileStat = os.fstat(inputHandle.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+        if not inputHandle.seekable():
+            return None
+        fileId = (
+            fileStat.st_dev,
+            fileStat.st_ino,
+            fileStat.st_size,
+            fileStat.st_mtime_ns,
+        )
+        if self.lastKey[0] == fileId:
+            return self.lastKey[1]
+
+        startPos = inputHandle.tell()
+        hasher = hashlib.blake2b(digest_size=16)
+        xmlHead = b""
+        while True:
+            block = inputHandle.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+            if len(xmlHead) < XML_SNIFF_SIZE:
+                xmlHead += block[:XML_SNIFF_SIZE]
+        inputHandle.seek(startPos)
+
+        # --the date is in the hash already, it is in the name to make it readable
+        dateMatch = PUBLISH_DATE_TAG.search(xmlHead)
+        publishDate = (
+            re.sub(rb"<[^>]*>|\W", b"", dateMatch.group(2)) if dateMatch else b""
+        )
+        cacheKey = f"{hasher.hexdigest()}-{publishDate.decode()}-v{PARSE_CACHE_VERSION}"
+        self.lastKey = (fileId, cacheKey)
+        return cacheKey
+
+    def cache_file(self, inputHandle):
+        """the cache file name for an input, None when it cannot be cached"""
+        cacheKey = self.cache_key(inputHandle)
+        return os.path.join(self.cacheDir, cacheKey + ".pickle") if cacheKey else None
+
+    def has_entries(self, inputHandle):
+        cacheFile = self.cache_file(inputHandle)
+        return bool(cacheFile) and os.path.exists(cacheFile)
+
+    def iter_entries(self, inputHandle, timer=None):
+        """stream (publish date, SdnEntry) from the cache, or from the xml while
+        caching them when the input has not been seen before"""
+        cacheFile = self.cache_file(inputHandle)
+        if not cacheFile:
+            yield from iter_sdn_entries(inputHandle, timer)
+            return
+        try:
+            cacheHandle = open(cacheFile, "rb")
+        except FileNotFoundError:
+            yield from self.write_entries(inputHandle, cacheFile, timer)
+            return
+
+        # --a hit makes it the most recently used
+        os.utime(cacheFile)
+        if timer:
+            timer.restart()
+        with cacheHandle:
+            while True:
+                try:
+                    entries = pickle.load(cacheHandle)
+                except EOFError:
+                    break
+                if timer:
+                    timer.mark("cache")
+                yield from entries
+
+    def write_entries(self, inputHandle, cacheFile, timer):
+        """parse the xml, pickling the entries in batches as they go by"""
+        # --written under a temporary name so a failed or abandoned parse, or a
+        # --batch worker on the same file, never leaves a partial cache file
+        tempFile = f"{cacheFile}.{os.getpid()}.tmp"
+        completed = False
+        try:
+            with open(tempFile, "wb") as cacheHandle:
+                entries = []
+                for publishDate, entry in iter_sdn_entries(inputHandle, timer):
+                    entries.append((publishDate, entry))
+                    if len(entries) >= PARSE_CACHE_BATCH:
+                        pickle.dump(entries, cacheHandle, pickle.HIGHEST_PROTOCOL)
+                        entries = []
+                        if timer:
+                            timer.mark("cache")
+                    yield publishDate, entry
+                pickle.dump(entries, cacheHandle, pickle.HIGHEST_PROTOCOL)
+            os.replace(tempFile, cacheFile)
+            completed = True
+        finally:
+            if not completed and os.path.exists(tempFile):
+                os.remove(tempFile)
+        self.evict()
+        if timer:
+            timer.mark("cache")
+
+    def evict(self):
+        """remove the least recently used cache files until the rest fit"""
+        cacheFiles = []
+        for dirEntry in os.scandir(self.cacheDir):
+            if not dirEntry.name.endswith(".pickle"):
+                continue
+            try:
+                fileStat = dirEntry.stat()
+            except FileNotFoundError:
+                continue
+            cacheFiles.append((fileStat.st_mtime, fileStat.st_size, dirEntry.path))
+        cacheBytes = sum(x[1] for x in cacheFiles)
+        for _, fileSize, fileName in sorted(cacheFiles):
+            if cacheBytes <= self.maxBytes:
+                break
+            try:
+                os.remove(fileName)
+            except FileNotFoundError:
+                pass
+            cacheBytes -= fileSize
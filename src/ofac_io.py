@@ -0,0 +1,255 @@
+import os
+import sys
+import csv
+import gzip
+import zipfile
+import zlib
+import mmap
+import io
+import glob
+
+from ofac_sdn import READ_BLOCK_SIZE
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+# --bytes held before each write to the output file
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# --compressed inputs are read through their decompressor, all as binary
+# --streams so the xml parser can detect the encoding itself
+COMPRESSED_INPUT_EXTS = (".gz", ".zip", ".zst")
+SDN_INPUT_EXTS = (".xml", ".xml.gz", ".xml.zst", ".zip")
+INPUT_DECODE_ERRORS: tuple[type[Exception], ...] = (
+    EOFError,
+    zlib.error,
+    gzip.BadGzipFile,
+    zipfile.BadZipFile,
+)
+if zstandard:
+    INPUT_DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+# ----------------------------------------
+class MappedInput(io.RawIOBase):
+    """a local file read through mmap, each read a single copy straight out
+    of the page cache rather than through a read system call and buffer"""
+
+    def __init__(self, fileName):
+        super().__init__()
+        self.handle = open(fileName, "rb")
+        self.map = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self.handle.fileno()
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += len(self.map)
+        self.pos = max(offset, 0)
+        return self.pos
+
+    def read(self, size=-1):
+        endPos = len(self.map) if size is None or size < 0 else self.pos + size
+        block = self.map[self.pos : endPos]
+        self.pos += len(block)
+        return block
+
+    def readinto(self, buffer):
+        block = self.read(len(buffer))
+        buffer[: len(block)] = block
+        return len(block)
+
+    def close(self):
+        if not self.closed:
+            self.map.close()
+            self.handle.close()
+        super().close()
+
+
+# ----------------------------------------
+def open_sdn_input(inputFile, useMmap=False):
+    """open an sdn file, a .gz, .zip or .zst of one, or - for stdin, as a binary
+    stream; useMmap reads an uncompressed local file through mmap"""
+    if inputFile == "-":
+        return os.fdopen(sys.stdin.fileno(), "rb", READ_BLOCK_SIZE, closefd=False)
+    lowerName = inputFile.lower()
+    if lowerName.endswith(".gz"):
+        return gzip.open(inputFile, "rb")
+    if lowerName.endswith(".zst"):
+        if not zstandard:
+            raise IOError("the zstandard module is needed for .zst input")
+        # --buffered so the format can be sniffed with peek()
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(inputFile, "rb"), read_across_frames=True, closefd=True
+            ),
+            READ_BLOCK_SIZE,
+        )
+    if lowerName.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(inputFile) as zipHandle:
+                xmlNames = [
+                    x for x in zipHandle.namelist() if x.lower().endswith(".xml")
+                ]
+                if len(xmlNames) != 1:
+                    raise IOError(f"{len(xmlNames)} xml files in the zip, not one")
+                # --the member keeps the zip file open until it is closed
+                return zipHandle.open(xmlNames[0])
+        except zipfile.BadZipFile as err:
+            raise IOError(err) from err
+    if useMmap and os.path.getsize(inputFile):
+        return MappedInput(inputFile)
+    return open(inputFile, "rb")
+
+
+# ----------------------------------------
+def input_base_name(inputFile):
+    """an input file name without its compression and xml extensions"""
+    if inputFile == "-":
+        return "sdn"
+    baseName = inputFile
+    for ext in COMPRESSED_INPUT_EXTS:
+        if baseName.lower().endswith(ext):
+            baseName = baseName[: -len(ext)]
+            break
+    return os.path.splitext(baseName)[0]
+
+
+# ----------------------------------------
+def batch_input_files(inputSpec):
+    """the sdn files of a directory or glob pattern, or just the one file named"""
+    if os.path.isdir(inputSpec):
+        return sorted(
+            x
+            for x in glob.glob(os.path.join(glob.escape(inputSpec), "*"))
+            if x.lower().endswith(SDN_INPUT_EXTS)
+        )
+    if glob.has_magic(inputSpec):
+        return sorted(glob.glob(inputSpec))
+    return [inputSpec]
+
+
+# ----------------------------------------
+def split_output_name(fileName):
+    """(base name, .json or "", .gz, .zst or "") of an output file name"""
+    baseName, jsonExt, compressExt = fileName, "", ""
+    for ext in (".gz", ".zst"):
+        if baseName.endswith(ext):
+            baseName, compressExt = baseName[: -len(ext)], ext
+    if baseName.endswith(".json"):
+        baseName, jsonExt = baseName[:-5], ".json"
+    return baseName, jsonExt, compressExt
+
+
+# ----------------------------------------
+def shard_file_name(fileName, shardNumber):
+    """insert the shard number in front of the .json extension"""
+    baseName, jsonExt, compressExt = split_output_name(fileName)
+    return f"{baseName}-{shardNumber:05d}{jsonExt}{compressExt}"
+
+
+# ----------------------------------------
+class OutputWriter:
+    """writes json lines to a plain, .gz or .zst file, rolling to a new
+    numbered file every shardSize records when asked to"""
+
+    def __init__(self, fileName, bufferSize=OUTPUT_BUFFER_SIZE, shardSize=0):
+        self.fileName = fileName
+        self.bufferSize = bufferSize
+        self.shardSize = shardSize
+        self.fileNames = []
+        self.handle = None
+        self.shardRecordCount = 0
+        if fileName.endswith(".zst") and not zstandard:
+            raise IOError("the zstandard module is needed for .zst output")
+        if not shardSize:
+            self.open_file(fileName)
+
+    def shard_file_name(self, shardNumber):
+        return shard_file_name(self.fileName, shardNumber)
+
+    def open_file(self, fileName):
+        if fileName.endswith(".gz"):
+            rawHandle = gzip.open(fileName, "wb")
+        elif fileName.endswith(".zst"):
+            rawHandle = zstandard.open(fileName, "wb")
+        else:
+            rawHandle = open(fileName, "wb", buffering=0)
+        self.handle = io.BufferedWriter(rawHandle, self.bufferSize)
+        self.fileNames.append(fileName)
+        self.shardRecordCount = 0
+
+    def write_lines(self, jsonLines):
+        """write a list of json lines, rolling to the next shard as each fills"""
+        while jsonLines:
+            if self.shardSize:
+                if not self.handle or self.shardRecordCount >= self.shardSize:
+                    self.close()
+                    self.open_file(self.shard_file_name(len(self.fileNames) + 1))
+                roomLeft = self.shardSize - self.shardRecordCount
+                shardLines, jsonLines = jsonLines[:roomLeft], jsonLines[roomLeft:]
+            else:
+                shardLines, jsonLines = jsonLines, []
+            self.handle.write("".join(shardLines).encode("utf-8"))
+            self.shardRecordCount += len(shardLines)
+
+    def close(self):
+        if self.handle:
+            self.handle.close()
+            self.handle = None
+
+
+# ----------------------------------------
+class OffsetsWriter:
+    """a tab separated sidecar giving each record's content hash and where its
+    line starts in the output, so another run can be diffed or a record read
+    without parsing the json"""
+
+    def __init__(self, offsets_filename, outputFile, shardSize=0):
+        self.outputFile = outputFile
+        self.shardSize = shardSize
+        self.recordCount = 0
+        self.fileName = outputFile
+        self.filePos = 0
+        self.handle = open(offsets_filename, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.handle, delimiter="\t", lineterminator="\n")
+        self.writer.writerow(["RECORD_ID", "RECORD_HASH", "FILE", "OFFSET", "LENGTH"])
+
+    def add_records(self, jsonRecords):
+        """note the records about to be written, in the order they are written"""
+        for jsonRecord in jsonRecords:
+            # --the same shard roll over as OutputWriter.write_lines
+            if self.shardSize and self.recordCount % self.shardSize == 0:
+                shardNumber = self.recordCount // self.shardSize + 1
+                self.fileName = shard_file_name(self.outputFile, shardNumber)
+                self.filePos = 0
+            lineLength = len(jsonRecord.jsonLine.encode("utf-8"))
+            self.writer.writerow(
+                [
+                    jsonRecord.recordId,
+                    jsonRecord.recordHash,
+                    self.fileName,
+                    self.filePos,
+                    lineLength,
+                ]
+            )
+            self.filePos += lineLength
+            self.recordCount += 1
+
+    def close(self):
+        self.handle.close()
@@ -2,523 +2,870 @@
 
 import os
 import sys
-import argparse
 import xml.etree.ElementTree as etree
-from datetime import datetime
-import csv
 import json
-import random
+import multiprocessing
+import shutil
+import tempfile
+import cProfile
+import tracemalloc
+import asyncio
+import dataclasses
+from collections import deque, namedtuple
+
+from ofac_records import (
+    canonical_record,
+    formatDate,
+    record_hash,
+    remove_empty_tags,
+    SerializedRecord,
+    validate_record,
+)
+from ofac_screening import screening_keys, ScreeningIndexBuilder
+from ofac_stats import (
+    code_review_report,
+    CodeValueStats,
+    count_code,
+    load_codes_file,
+    save_codes_file,
+    StatCollector,
+)
+from ofac_metrics import (
+    ProgressMeter,
+    StageTimer,
+    TimedReader,
+    write_metrics_file,
+    write_tracemalloc_file,
+)
+from ofac_sdn import (
+    WORKER_BATCH_SIZE,
+    extract_sdn_entry,
+    iter_sdn_chunks,
+    strip_namespaces,
+)
+from ofac_io import (
+    INPUT_DECODE_ERRORS,
+    batch_input_files,
+    input_base_name,
+    OffsetsWriter,
+    open_sdn_input,
+    OUTPUT_BUFFER_SIZE,
+    OutputWriter,
+    split_output_name,
+)
+from ofac_advanced import is_advanced_xml, iter_sdn_entries
+from ofac_cache import ParseCache
+from ofac_run import DeltaState, RunContext
+from ofac_async import SINK_URL, open_async_sink, run_pipeline
+from ofac_batch import (
+    BatchJob,
+    init_mapper_worker,
+    map_sdn_chunk,
+    map_sdn_file_worker,
+    run_batch_job_in_process,
+)
+from ofac_args import mapper_argparser
+
+# --the codes file used when a mapper is created without one
+DEFAULT_CODES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "ofac_codes.csv"
+)
+
+# --an idType's senzing attribute, the attributes for its type and country,
+# --whether to strip an "IMO " prefix and its row in code_conversion_data
+IdTypeMapping = namedtuple(
+    "IdTypeMapping", "senzingAttr typeAttr countryAttr stripImo codeData"
+)
+IdCountryMapping = namedtuple("IdCountryMapping", "isoCode codeData")
+
+
+# --sdnType: senzing record type
+SDN_RECORD_TYPES = {
+    "Entity": "ORGANIZATION",
+    "Individual": "PERSON",
+    "Vessel": "VESSEL",
+    "Aircraft": "AIRCRAFT",
+}
+
+# --filter for only entities and individuals unless they want to include all
+MAPPED_SDN_TYPES = ("Entity", "Individual")
+
+SDN_ADDRESS_FIELDS = (
+    ("address2", "ADDR_LINE2"),
+    ("address3", "ADDR_LINE3"),
+    ("city", "ADDR_CITY"),
+    ("stateOrProvince", "ADDR_STATE"),
+    ("postalCode", "ADDR_POSTAL_CODE"),
+    ("country", "ADDR_COUNTRY"),
+)
+
+SDN_VESSEL_FIELDS = (
+    ("callSign", "CALL_SIGN"),
+    ("vesselType", "vesselType"),
+    ("vesselFlag", "vesselFlag"),
+    ("vesselOwner", "vesselOwner"),
+    ("tonnage", "tonnage"),
+    ("grossRegisteredTonnage", "grossRegisteredTonnage"),
+)
 
 
 # ----------------------------------------
-def getValue(segment, tagName):
-    """get an xml element text value"""
-    try:
-        value = segment.find(tagName).text.strip()
-    except:
-        value = ""
-    return value
+@dataclasses.dataclass
+class MapperOptions:
+    """what a mapper gathers as it maps and adds to or does with each record"""
+
+    statsEnabled: bool = True
+    profile: bool = False
+    # --hash each record for delta mode or the offsets file
+    hashRecords: bool = False
+    indexRecords: bool = False
+    validateRecords: bool = False
+    canonical: bool = False
+    hashField: bool = False
 
 
 # ----------------------------------------
-def formatDate(inStr, outputFormat="%Y-%m-%d"):
-    """format a date as yyyy-mm-dd"""
-    # --bypass if not complete
-    outStr = inStr
-    # if len(inStr) >= 6:
-
-    formatList = []
-    formatList.append("%Y-%m-%d")
-    formatList.append("%m/%d/%Y")
-    formatList.append("%m/%d/%y")
-    formatList.append("%d %b %Y")
-    formatList.append("%d %m %Y")
-    # formatList.append("%Y")
-
-    # formatList.append("CIRCA %Y")
-
-    for format in formatList:
-        # outStr = datetime.strftime(datetime.strptime(inStr, format), '%Y-%m-%d')
-        try:
-            outStr = datetime.strftime(datetime.strptime(inStr, format), outputFormat)
-        except:
-            pass
-        else:
-            break
+@dataclasses.dataclass
+class RunOptions:
+    """where a command line run reads and writes and how it spreads the work"""
 
-    return outStr
+    inputFile: str
+    outputFile: str
+    # --where delta mode writes deletes for records no longer on the list
+    deleteFile: str = ""
+    workers: int = 1
+    bufferSize: int = OUTPUT_BUFFER_SIZE
+    shardSize: int = 0
+    mmapInput: bool = False
 
 
 # ----------------------------------------
-def updateStat(cat1, cat2, example=None):
-    if cat1 not in statPack:
-        statPack[cat1] = {}
-    if cat2 not in statPack[cat1]:
-        statPack[cat1][cat2] = {}
-        statPack[cat1][cat2]["count"] = 1
-
-    statPack[cat1][cat2]["count"] += 1
-    if example:
-        if "examples" not in statPack[cat1][cat2]:
-            statPack[cat1][cat2]["examples"] = []
-        if example not in statPack[cat1][cat2]["examples"]:
-            if len(statPack[cat1][cat2]["examples"]) < 5:
-                statPack[cat1][cat2]["examples"].append(example)
+class OfacMapper:
+    """maps ofac sdn xml to senzing json, holding the codes table and statistics"""
+
+    def __init__(
+        self,
+        codes_filename=None,
+        code_conversion_data=None,
+        options=None,
+        parseCache=None,
+    ):
+        if code_conversion_data is None:
+            code_conversion_data = load_codes_file(
+                codes_filename or DEFAULT_CODES_FILE
+            )[0]
+        self.code_conversion_data = code_conversion_data
+        self.options = options or MapperOptions()
+        self.statPack = StatCollector(self.options.statsEnabled)
+        self.timer = StageTimer(self.options.profile)
+        self.parseCache = parseCache
+        self.id_type_table = {}
+        self.id_country_table = {}
+        self.compile_code_tables()
+
+    def iter_records(self, source, serialize=False):
+        """yield each mapped record of an sdn xml file name or binary file object,
+        as a dict or, when serialize is set, as the json line the command line
+        writes, leaving out those that fail validation when validateRecords is set"""
+        if isinstance(source, (str, os.PathLike)):
+            with open_sdn_input(os.fspath(source)) as inputHandle:
+                yield from self.iter_records(inputHandle, serialize)
+            return
+
+        for jsonData in self.iter_mapped(source):
+            if serialize:
+                jsonLine = self.serialize_record(jsonData).jsonLine
+                if jsonLine:
+                    yield jsonLine
+            elif not (self.options.validateRecords and self.reject_line(jsonData)):
+                yield jsonData
+
+    def iter_mapped(self, inputHandle):
+        """yield each mapped record as a dict, before any validation"""
+        timer = self.timer if self.timer.enabled else None
+        for entryCount, (publishDate, entry) in enumerate(
+            self.iter_entries(inputHandle, timer), 1
+        ):
+            jsonData = self.map_sdn_entry(entry, publishDate)
+            if entryCount % WORKER_BATCH_SIZE == 0:
+                self.fold_code_values()
+            if jsonData:
+                yield jsonData
+
+    def iter_entries(self, inputHandle, timer=None):
+        """stream (publish date, SdnEntry), through the parse cache when there is one"""
+        if self.parseCache:
+            return self.parseCache.iter_entries(inputHandle, timer)
+        return iter_sdn_entries(inputHandle, timer)
+
+    def iter_serialized(self, inputHandle, workers=1):
+        """yield lists of serialized records in document order, mapping them
+        across a process pool when workers is more than 1"""
+        # --the advanced xml cannot be cut into independent chunks and cached
+        # --entries only need mapping, which one process keeps up with
+        if (
+            workers <= 1
+            or is_advanced_xml(inputHandle)
+            or (self.parseCache and self.parseCache.has_entries(inputHandle))
+        ):
+            for jsonData in self.iter_mapped(inputHandle):
+                yield [self.serialize_record(jsonData)]
+            return
+
+        pending = deque()
+        with multiprocessing.Pool(
+            workers,
+            initializer=init_mapper_worker,
+            initargs=(self.worker_mapper(),),
+        ) as pool:
+            if self.timer.enabled:
+                inputHandle = TimedReader(inputHandle, self.timer, "split")
+                self.timer.restart()
+            for publishDate, xmlChunk in iter_sdn_chunks(
+                inputHandle, WORKER_BATCH_SIZE
+            ):
+                pending.append(pool.apply_async(map_sdn_chunk, (publishDate, xmlChunk)))
+                self.timer.mark("split")
+                # --bound the work in flight so memory stays flat
+                while len(pending) > workers * 2:
+                    yield self.collect_chunk(pending.popleft().get())
+            while pending:
+                yield self.collect_chunk(pending.popleft().get())
+
+    def map_chunk(self, publishDate, xmlChunk):
+        """map a chunk of sdn entries, returning its records and the stats gathered"""
+        jsonRecords = []
+        self.timer.restart()
+        xmlRoot = etree.fromstring(xmlChunk)
+        self.timer.mark("parse")
+        for sdnEntry in xmlRoot:
+            if strip_namespaces(sdnEntry).tag != "sdnEntry":
+                continue
+            self.timer.mark("strip")
+            entry = extract_sdn_entry(sdnEntry)
+            self.timer.mark("extract")
+            jsonData = self.map_sdn_entry(entry, publishDate)
+            if jsonData:
+                jsonRecords.append(self.serialize_record(jsonData))
+        return (
+            jsonRecords,
+            self.statPack.take(),
+            self.take_code_stats(),
+            self.timer.take(),
+        )
+
+    def collect_chunk(self, chunkResult):
+        """merge a worker's stats and return its serialized records"""
+        self.timer.mark("workers")
+        jsonRecords, partialStats, codeStats, stageSeconds = chunkResult
+        self.statPack.merge(partialStats)
+        self.merge_code_stats(codeStats)
+        self.timer.merge(stageSeconds)
+        self.timer.restart()
+        return jsonRecords
+
+    def map_sdn_entry(self, entry, publishDate):
+        """map an SdnEntry record to senzing json, None if its type is not mapped"""
+        if entry.sdnType not in MAPPED_SDN_TYPES:
+            return None
+        g2RecordType = SDN_RECORD_TYPES[entry.sdnType]
+        isIndividual = entry.sdnType == "Individual"
+        self.statPack.add("!RECORD_TYPE", g2RecordType)
+
+        jsonData = {}
+        jsonData["DATA_SOURCE"] = "OFAC"
+        jsonData["RECORD_TYPE"] = g2RecordType
+        jsonData["RECORD_ID"] = entry.uid
+        jsonData["OFAC_ID"] = entry.uid
+        jsonData["PUBLISH_DATE"] = publishDate
+        if entry.title:
+            jsonData["SDN_TITLE"] = entry.title
+        if entry.remarks:
+            jsonData["SDN_REMARKS"] = entry.remarks
+
+        # --add the SDN programs (usually only one)
+        if entry.programs:
+            jsonData["SDN_PROGRAM"] = ", ".join(entry.programs)
+
+        # --get the names
+        nameList = []
+        # --get the primary
+        if entry.lastName or entry.firstName:
+            nameDict = {}
+            nameDict["NAME_TYPE"] = "PRIMARY"
+            if not isIndividual:
+                nameDict["NAME_ORG"] = entry.lastName
             else:
-                randomSampleI = random.randint(2, 4)
-                statPack[cat1][cat2]["examples"][randomSampleI] = example
-    return
+                if entry.lastName:
+                    nameDict["NAME_LAST"] = entry.lastName
+                if entry.firstName:
+                    nameDict["NAME_FIRST"] = entry.firstName
+            nameList.append(nameDict)
+
+        # --add any AKAs
+        for aka in entry.akas:
+            if aka.lastName or aka.firstName:
+                nameDict = {}
+                nameDict["NAME_TYPE"] = aka.type.replace(".", "").upper()
+                if not isIndividual:
+                    nameDict["NAME_ORG"] = aka.lastName
+                else:
+                    if aka.lastName:
+                        nameDict["NAME_LAST"] = aka.lastName
+                    if aka.firstName:
+                        nameDict["NAME_FIRST"] = aka.firstName
+                nameList.append(nameDict)
+        if nameList:
+            jsonData["NAME_LIST"] = nameList
+        self.timer.mark("names")
+
+        # --add any attributes (note: sublists must be dictionaries even if only a single field)
+        attrList = []
+        for dateOfBirth in entry.datesOfBirth:
+            dateValue = formatDate(dateOfBirth)
+            if dateValue:
+                attrList.append({"DATE_OF_BIRTH": dateValue})
+        for placeOfBirth in entry.placesOfBirth:
+            attrList.append({"PLACE_OF_BIRTH": placeOfBirth})
+        for country in entry.nationalities:
+            attrList.append({"NATIONALITY": country})
+        for country in entry.citizenships:
+            attrList.append({"CITIZENSHIP": country})
+        if attrList:
+            jsonData["ATTR_LIST"] = attrList
+        self.timer.mark("attributes")
+
+        # --add any addresses
+        addrList = []
+        for address in entry.addresses:
+            addrDict = {}
+            if address.address1 and address.address1 != "Address Unknown":
+                addrDict["ADDR_LINE1"] = address.address1
+            for field, senzingAttr in SDN_ADDRESS_FIELDS:
+                value = getattr(address, field)
+                if value:
+                    addrDict[senzingAttr] = value
+            if addrDict:
+                addrList.append(addrDict)
+                if len(addrDict) == 1 and "ADDR_COUNTRY" in addrDict:
+                    self.statPack.add("!ADDRESS", "country only")
+                else:
+                    self.statPack.add("!ADDRESS", "UNTYPED")
+        if addrList:
+            jsonData["ADDR_LIST"] = addrList
+        self.timer.mark("addresses")
+
+        # --add any ID numbers
+        idList = []
+        for sdnId in entry.ids:
+            if sdnId.idNumber:
+
+                idData = {}
+                idType = sdnId.idType
+                idNumber = sdnId.idNumber
+                idCountry = sdnId.idCountry
+
+                idMapping = self.id_type_table.get(idType)
+                if not idMapping:
+                    idMapping = self.compile_id_type(idType)
+                count_code(idMapping.codeData, idNumber)
+                senzingAttr = idMapping.senzingAttr
+                if idCountry:
+                    countryMapping = self.id_country_table.get(idCountry)
+                    if not countryMapping:
+                        countryMapping = self.compile_id_country(idCountry)
+                    count_code(countryMapping.codeData, idType)
+                    senzingCountry = countryMapping.isoCode
+                else:
+                    senzingCountry = ""
+
+                if senzingAttr:
+                    if idMapping.stripImo:
+                        idNumber = idNumber.replace("IMO ", "")
+                    idData[senzingAttr] = idNumber
+                    if idMapping.typeAttr:
+                        idData[idMapping.typeAttr] = idType
+                    if senzingCountry and idMapping.countryAttr:
+                        idData[idMapping.countryAttr] = senzingCountry
+                    idList.append(idData)
+
+                else:
+                    senzingAttr = "UNKNOWN"
+                    if idType not in jsonData:
+                        jsonData[idType] = idNumber + (
+                            f" ({idCountry})" if idCountry else ""
+                        )
+                    else:
+                        jsonData[idType] += (
+                            " | " + idNumber + (f" ({idCountry})" if idCountry else "")
+                        )
 
+                # self.statPack.add(f'!{senzingAttr}', f"{idType}", f"{idNumber}|{senzingCountry}")
+
+        if idList:
+            jsonData["ID_LIST"] = idList
+
+        # --still some vessel info in this structure
+        if g2RecordType == "VESSEL" and entry.vesselInfo:
+            for field, senzingAttr in SDN_VESSEL_FIELDS:
+                value = getattr(entry.vesselInfo, field)
+                if value:
+                    jsonData[senzingAttr] = value
+        self.timer.mark("ids")
+
+        remove_empty_tags(jsonData)
+        self.statPack.add_record(jsonData)
+        self.timer.mark("stats")
+        return jsonData
+
+    def serialize_record(self, jsonData):
+        """return a mapped record as a SerializedRecord of its RECORD_ID, content
+        hash, json line, screening keys and rejects line"""
+        options = self.options
+        if options.canonical:
+            canonical_record(jsonData)
+        if options.validateRecords:
+            rejectLine = self.reject_line(jsonData)
+            if rejectLine:
+                return SerializedRecord(
+                    jsonData.get("RECORD_ID"), None, None, None, rejectLine
+                )
+        recordHash = (
+            record_hash(jsonData) if options.hashRecords or options.hashField else None
+        )
+        if options.hashField:
+            jsonData["RECORD_HASH"] = recordHash
+        jsonLine = json.dumps(jsonData, sort_keys=options.canonical) + "\n"
+        self.timer.mark("serialize")
+        screenKeys = None
+        if options.indexRecords:
+            screenKeys = screening_keys(jsonData)
+            self.timer.mark("screen")
+        return SerializedRecord(
+            jsonData["RECORD_ID"], recordHash, jsonLine, screenKeys, None
+        )
+
+    def reject_line(self, jsonData):
+        """the rejects file line for a record that fails validation, else None"""
+        rejectReasons = validate_record(jsonData)
+        self.timer.mark("validate")
+        if not rejectReasons:
+            return None
+        for reason in rejectReasons:
+            self.statPack.add(
+                "!REJECTED", reason.split(":")[0], jsonData.get("RECORD_ID")
+            )
+        return json.dumps({"REJECT_REASONS": rejectReasons, "RECORD": jsonData}) + "\n"
+
+    def get_code_data(self, raw_type, raw_code, **kwargs):
+        """get a code's row from code_conversion_data, adding it as unreviewed if new"""
+        if raw_type not in self.code_conversion_data:
+            self.code_conversion_data[raw_type] = {}
+        if raw_code not in self.code_conversion_data[raw_type]:
+            self.code_conversion_data[raw_type][raw_code] = {
+                "REVIEWED": "N",
+                "RAW_TYPE": raw_type,
+                "RAW_CODE": raw_code,
+                "RAW_MODIFIER": "",
+                "SENZING_ATTR": kwargs.get("senzing_attr", ""),
+                "SENZING_DEFAULT": kwargs.get("senzing_default", ""),
+                "COUNT": 0,
+                "VALUES": CodeValueStats(),
+                "NEW": True,
+            }
+        return self.code_conversion_data[raw_type][raw_code]
+
+    def compile_id_type(self, idType):
+        """resolve an idType's mapping once, adding it to id_type_table"""
+        code_data = self.get_code_data("idType", idType)
+        senzingAttr = code_data["SENZING_ATTR"]
+        self.id_type_table[idType] = IdTypeMapping(
+            senzingAttr,
+            (
+                senzingAttr.replace("_NUMBER", "_TYPE")
+                if senzingAttr in ("OTHER_ID_NUMBER", "NATIONAL_ID_NUMBER")
+                else None
+            ),
+            (
+                senzingAttr.replace("_NUMBER", "_COUNTRY")
+                if senzingAttr.endswith("_NUMBER")
+                else None
+            ),
+            senzingAttr == "IMO_NUMBER",
+            code_data,
+        )
+        return self.id_type_table[idType]
+
+    def compile_id_country(self, idCountry):
+        """resolve an idCountry's iso code once, adding it to id_country_table"""
+        code_data = self.get_code_data("idCountry", idCountry)
+        self.id_country_table[idCountry] = IdCountryMapping(
+            code_data["SENZING_DEFAULT"], code_data
+        )
+        return self.id_country_table[idCountry]
+
+    def compile_code_tables(self):
+        """build the id lookup tables from code_conversion_data"""
+        self.id_type_table.clear()
+        self.id_country_table.clear()
+        for idType in list(self.code_conversion_data.get("idType", {})):
+            self.compile_id_type(idType)
+        for idCountry in list(self.code_conversion_data.get("idCountry", {})):
+            self.compile_id_country(idCountry)
+
+    def worker_mapper(self, parseCache=None):
+        """a fresh mapper with this one's codes table and options for a worker
+        process, whose stats are handed back with take_code_stats"""
+        return OfacMapper(
+            code_conversion_data=self.code_conversion_data,
+            options=self.options,
+            parseCache=parseCache,
+        )
+
+    def fold_code_values(self):
+        """fold the values counted since the last call into each code's top values,
+        called every WORKER_BATCH_SIZE entries to match the chunks workers map"""
+        for raw_codes in self.code_conversion_data.values():
+            for code_data in raw_codes.values():
+                code_data["VALUES"].topValues.fold()
+
+    def take_code_stats(self):
+        """hand back the code counts gathered since the last call and reset them"""
+        codeStats = {}
+        for raw_type, raw_codes in self.code_conversion_data.items():
+            for raw_code, code_data in raw_codes.items():
+                if code_data["COUNT"]:
+                    if raw_type not in codeStats:
+                        codeStats[raw_type] = {}
+                    codeStats[raw_type][raw_code] = {
+                        "SENZING_ATTR": code_data["SENZING_ATTR"],
+                        "SENZING_DEFAULT": code_data["SENZING_DEFAULT"],
+                        "COUNT": code_data["COUNT"],
+                        "VALUES": code_data["VALUES"],
+                    }
+                    code_data["COUNT"] = 0
+                    code_data["VALUES"] = CodeValueStats()
+        return codeStats
+
+    def merge_code_stats(self, codeStats):
+        """fold the code counts gathered by a worker into code_conversion_data"""
+        for raw_type, raw_codes in codeStats.items():
+            for raw_code, partial_data in raw_codes.items():
+                if (
+                    raw_type not in self.code_conversion_data
+                    or raw_code not in self.code_conversion_data[raw_type]
+                ):
+                    self.get_code_data(
+                        raw_type,
+                        raw_code,
+                        senzing_attr=partial_data["SENZING_ATTR"],
+                        senzing_default=partial_data["SENZING_DEFAULT"],
+                    )
 
-# ----------------------------------------
-def load_codes_file(codes_filename):
-    code_conversion_data = {}
-    unmapped_code_count = 0
-    with open(codes_filename, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row["RAW_TYPE"] = row["RAW_TYPE"]
-            row["RAW_CODE"] = row["RAW_CODE"]
-            if row["RAW_TYPE"] not in code_conversion_data:
-                code_conversion_data[row["RAW_TYPE"]] = {}
-            row["COUNT"] = 0
-            row["EXAMPLES"] = {}
-            code_conversion_data[row["RAW_TYPE"]][row["RAW_CODE"]] = row
-            if row["REVIEWED"].upper() != "Y":
-                unmapped_code_count += 1
-    return code_conversion_data, unmapped_code_count
+                code_data = self.code_conversion_data[raw_type][raw_code]
+                code_data["COUNT"] += partial_data["COUNT"]
+                code_data["VALUES"].merge(partial_data["VALUES"])
 
+    def save_codes_file(self, codes_filename):
+        """write the codes file, returning False when it was already up to date"""
+        return save_codes_file(codes_filename, self.code_conversion_data)
 
-# ----------------------------------------
-def save_codes_file(codes_filename):
-    headers = [
-        "REVIEWED",
-        "RAW_TYPE",
-        "RAW_CODE",
-        "RAW_MODIFIER",
-        "SENZING_ATTR",
-        "SENZING_DEFAULT",
-        "RECORD_COUNT",
-        "UNIQUE_COUNT",
-        "UNIQUE_PERCENT",
-        "TOP1",
-        "TOP2",
-        "TOP3",
-        "TOP4",
-        "TOP5",
-        "TOP6",
-        "TOP7",
-        "TOP8",
-        "TOP9",
-        "TOP10",
-    ]
-
-    with open(codes_filename, "w", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for raw_type in sorted(code_conversion_data.keys()):
-            for raw_code in sorted(code_conversion_data[raw_type].keys()):
-                code_data = code_conversion_data[raw_type][raw_code]
-                uniq_record_count = 0
-                uniq_value_count = len(code_data["EXAMPLES"])
-                topValues = []
-                for value in sorted(
-                    code_data["EXAMPLES"].items(), key=lambda x: x[1], reverse=True
-                ):
-                    if value[0] != "null":
-                        uniq_record_count += value[1]
-                        if len(topValues) < 10:
-                            topValues.append(f"{value[0]} ({value[1]})")
-                while len(topValues) < 10:
-                    topValues.append("")
-
-                code_record = [
-                    code_data["REVIEWED"],
-                    code_data["RAW_TYPE"],
-                    code_data["RAW_CODE"],
-                    code_data["RAW_MODIFIER"],
-                    code_data["SENZING_ATTR"],
-                    code_data["SENZING_DEFAULT"],
-                    uniq_record_count,
-                    uniq_value_count,
-                    (
-                        round(float(uniq_value_count) / uniq_record_count * 100, 2)
-                        if uniq_record_count
-                        else 0
-                    ),
-                    topValues[0],
-                    topValues[1],
-                    topValues[2],
-                    topValues[3],
-                    topValues[4],
-                    topValues[5],
-                    topValues[6],
-                    topValues[7],
-                    topValues[8],
-                    topValues[9],
-                ]
-                writer.writerow(code_record)
+    def code_review_report(self):
+        return code_review_report(self.code_conversion_data)
 
 
 # ----------------------------------------
-def update_code_stats(raw_type, raw_code, example_value=None, **kwargs):
-    if raw_type not in code_conversion_data:
-        code_conversion_data[raw_type] = {}
-    if raw_code not in code_conversion_data[raw_type]:
-        code_conversion_data[raw_type][raw_code] = {
-            "REVIEWED": "N",
-            "RAW_TYPE": raw_type,
-            "RAW_CODE": raw_code,
-            "RAW_MODIFIER": "",
-            "SENZING_ATTR": kwargs.get("senzing_attr", ""),
-            "SENZING_DEFAULT": kwargs.get("senzing_default", ""),
-            "COUNT": 0,
-            "EXAMPLES": {},
-        }
-
-    code_conversion_data[raw_type][raw_code]["COUNT"] += 1
-    if example_value:
-        if example_value in code_conversion_data[raw_type][raw_code]["EXAMPLES"]:
-            code_conversion_data[raw_type][raw_code]["EXAMPLES"][example_value] += 1
-        elif len(code_conversion_data[raw_type][raw_code]["EXAMPLES"]) < 1000000:
-            code_conversion_data[raw_type][raw_code]["EXAMPLES"][example_value] = 1
+class RunError(Exception):
+    """a run that could not finish, its message worded for the console"""
 
 
 # ----------------------------------------
-def capture_mapped_stats(json_data):
-    record_type = json_data.get("RECORD_TYPE", "UNKNOWN_RECORD_TYPE")
-    for key1 in json_data:
-        if type(json_data[key1]) != list:
-            updateStat(record_type, key1, json_data[key1])
-        else:
-            for subrecord in json_data[key1]:
-                for key2 in subrecord:
-                    updateStat(record_type, key2, subrecord[key2])
+def open_run_files(runOptions):
+    """open the input and output of a single file run, raising RunError when
+    either cannot be opened"""
+    # --open as binary so the xml parser can detect the encoding itself
+    try:
+        inputHandle = open_sdn_input(runOptions.inputFile, runOptions.mmapInput)
+    except IOError as err:
+        raise RunError(f"could not open {runOptions.inputFile}: {err}") from err
+
+    # --open output file
+    print(f"\nwriting to {runOptions.outputFile} ...")
+    try:
+        outputHandle = OutputWriter(
+            runOptions.outputFile, runOptions.bufferSize, runOptions.shardSize
+        )
+    except IOError as err:
+        inputHandle.close()
+        raise RunError(f"could not open {runOptions.outputFile}, {err}") from err
+    return inputHandle, outputHandle
 
 
 # ----------------------------------------
-def remove_empty_tags(d):
-    if isinstance(d, dict):
-        for k, v in list(d.items()):
-            if v is None or len(str(v).strip()) == 0:
-                del d[k]
-            else:
-                remove_empty_tags(v)
-    if isinstance(d, list):
-        for v in d:
-            remove_empty_tags(v)
-    return d
+def write_run_records(mapper, runContext, runOptions, inputHandle, outputHandle):
+    """map each sdn entry as it is streamed in, raising RunError when the input
+    cannot be read or the output written"""
+    try:
+        for jsonRecords in mapper.iter_serialized(inputHandle, runOptions.workers):
+            jsonRecords = runContext.route_records(jsonRecords, mapper.timer)
+            try:
+                outputHandle.write_lines([x.jsonLine for x in jsonRecords])
+            except IOError as err:
+                raise RunError(f"could not write to output file: {err}") from err
+            mapper.timer.mark("write")
+            runContext.add_written(len(jsonRecords))
+    except etree.ParseError as err:
+        raise RunError(f"XML Error: {err}") from err
+    except (OSError,) + INPUT_DECODE_ERRORS as err:
+        raise RunError(f"could not read {runOptions.inputFile}: {err}") from err
 
 
 # ----------------------------------------
-def processFile():
+def processFile(mapper, runContext, runOptions):
     """convert the ofac sdn xml file to json for senzing"""
 
-    print(f"\nReading from: {inputFile} ...")
+    print(f"\nReading from: {runOptions.inputFile} ...")
+    try:
+        inputHandle, outputHandle = open_run_files(runOptions)
+        try:
+            write_run_records(mapper, runContext, runOptions, inputHandle, outputHandle)
+        finally:
+            inputHandle.close()
+            outputHandle.close()
+        mapper.timer.mark("write")
+        result = report_run(runContext, runOptions, outputHandle.fileNames)
+    except RunError as err:
+        print(f"\n{err}\n")
+        result = -1
+    return result
+
+
+# ----------------------------------------
+def processFileAsync(mapper, runContext, runOptions):
+    """convert the ofac sdn xml file through the asyncio pipeline, streaming
+    records to the sink while the file is still being parsed"""
+    inputFile, outputFile = runOptions.inputFile, runOptions.outputFile
 
-    # --read the file into memory
+    print(f"\nReading from: {inputFile} ...")
     try:
-        f = open(inputFile)
+        inputHandle = open_sdn_input(inputFile, runOptions.mmapInput)
     except IOError as err:
         print(f"\ncould not open {inputFile}: {err}\n")
         return -1
 
-    xmlDoc = f.read()
-    f.close()
-    if type(xmlDoc) != str:
-        xmlDoc = xmlDoc.decode("utf-8")
-
-    # --name spaces not needed and can mess up etree if not accessible
-    startPos = xmlDoc.find(" xmlns:")
-    while startPos > 0:
-        xmlDoc = xmlDoc[0:startPos] + xmlDoc[xmlDoc.find(">", startPos) :]
-        startPos = xmlDoc.find(" xmlns:")
-
-    # --try to parse
+    print(f"\nwriting to {outputFile} ...")
+    try:
+        sink = open_async_sink(outputFile, runOptions.bufferSize, runOptions.shardSize)
+    except ValueError as err:
+        inputHandle.close()
+        print(f"\n{err}\n")
+        return -1
     try:
-        xmlRoot = etree.fromstring(xmlDoc)
+        asyncio.run(run_pipeline(mapper, inputHandle, sink, runContext))
     except etree.ParseError as err:
         print(f"\nXML Error: {err}\n")
         return -1
-    except:
-        print(f"\n{inputFile} is not a valid XML file!\n")
+    except INPUT_DECODE_ERRORS as err:
+        print(f"\ncould not read {inputFile}: {err}\n")
         return -1
-    publishDate = getValue(xmlRoot, "publishInformation/Publish_Date")
-
-    # --open output file
-    print(f"\nwriting to {outputFile} ...")
-    try:
-        outputHandle = open(outputFile, "w", encoding="utf-8", newline="")
-    except IOError as err:
-        print(f"\ncould not open {outputFile}, {err}\n")
+    except (IOError, OSError) as err:
+        print(f"\ncould not write to {outputFile}: {err}\n")
         return -1
+    finally:
+        inputHandle.close()
+    return report_run(runContext, runOptions, sink.fileNames)
 
-    # --for each sdn entry record
-    rowCnt = 0
-    for sdnEntry in xmlRoot.findall("sdnEntry"):
-
-        # --filter for only entities and individuals unless they want to include all
-        g2RecordType = None
-        if getValue(sdnEntry, "sdnType") in ("Entity", "Individual"):
-            if getValue(sdnEntry, "sdnType") == "Entity":
-                g2RecordType = "ORGANIZATION"
-            elif getValue(sdnEntry, "sdnType") == "Individual":
-                g2RecordType = "PERSON"
-            elif getValue(sdnEntry, "sdnType") == "Vessel":
-                g2RecordType = "VESSEL"
-            elif getValue(sdnEntry, "sdnType") == "Aircraft":
-                g2RecordType = "AIRCRAFT"
-            else:
-                updateStat("!UNKNOWN_RECORD_TYPE", getValue(sdnEntry, "sdnType"))
-
-        if g2RecordType:
-            updateStat("!RECORD_TYPE", g2RecordType)
-            rowCnt += 1
-
-            jsonData = {}
-            jsonData["DATA_SOURCE"] = "OFAC"
-            jsonData["RECORD_TYPE"] = g2RecordType
-            jsonData["RECORD_ID"] = getValue(sdnEntry, "uid")
-            jsonData["OFAC_ID"] = getValue(sdnEntry, "uid")
-            jsonData["PUBLISH_DATE"] = publishDate
-            if getValue(sdnEntry, "title"):
-                jsonData["SDN_TITLE"] = getValue(sdnEntry, "title")
-            if getValue(sdnEntry, "remarks"):
-                jsonData["SDN_REMARKS"] = getValue(sdnEntry, "remarks")
-
-            # --add the SDN programs (usually only one)
-            programList = None
-            for programRecord in sdnEntry.findall("programList"):
-                if getValue(programRecord, "program"):
-                    if not programList:
-                        programList = getValue(programRecord, "program")
-                    else:
-                        programList = (
-                            programList + ", " + getValue(programRecord, "program")
-                        )
-            if programList:
-                jsonData["SDN_PROGRAM"] = programList
-
-            # --get the names
-            nameList = []
-            # --get the primary
-            if getValue(sdnEntry, "lastName") or getValue(sdnEntry, "firstName"):
-                nameDict = {}
-                nameDict["NAME_TYPE"] = "PRIMARY"
-                if getValue(sdnEntry, "sdnType") != "Individual":
-                    nameDict["NAME_ORG"] = getValue(sdnEntry, "lastName")
-                else:
-                    if getValue(sdnEntry, "lastName"):
-                        nameDict["NAME_LAST"] = getValue(sdnEntry, "lastName")
-                    if getValue(sdnEntry, "firstName"):
-                        nameDict["NAME_FIRST"] = getValue(sdnEntry, "firstName")
-                nameList.append(nameDict)
-
-            # --add any AKAs
-            for subRecord in sdnEntry.findall("akaList/aka"):
-                if getValue(subRecord, "lastName") or getValue(subRecord, "firstName"):
-                    nameDict = {}
-                    nameDict["NAME_TYPE"] = (
-                        getValue(subRecord, "type").replace(".", "").upper()
-                    )
-                    if getValue(sdnEntry, "sdnType") != "Individual":
-                        nameDict["NAME_ORG"] = getValue(subRecord, "lastName")
-                    else:
-                        if getValue(subRecord, "lastName"):
-                            nameDict["NAME_LAST"] = getValue(subRecord, "lastName")
-                        if getValue(subRecord, "firstName"):
-                            nameDict["NAME_FIRST"] = getValue(subRecord, "firstName")
-                    nameList.append(nameDict)
-            if nameList:
-                jsonData["NAME_LIST"] = nameList
-
-            # --add any attributes (note: sublists must be dictionaries even if only a single field)
-            attrList = []
-            for subRecord in sdnEntry.findall("dateOfBirthList/dateOfBirthItem"):
-                if getValue(subRecord, "dateOfBirth"):
-                    if formatDate(getValue(subRecord, "dateOfBirth")):
-                        attrList.append(
-                            {
-                                "DATE_OF_BIRTH": formatDate(
-                                    getValue(subRecord, "dateOfBirth")
-                                )
-                            }
-                        )
-
-            for subRecord in sdnEntry.findall("placeOfBirthList/placeOfBirthItem"):
-                if getValue(subRecord, "placeOfBirth"):
-                    countryName = getValue(subRecord, "placeOfBirth")
-                    attrList.append({"PLACE_OF_BIRTH": countryName})
 
-            for subRecord in sdnEntry.findall("nationalityList/nationality"):
-                if getValue(subRecord, "country"):
-                    attrList.append({"NATIONALITY": getValue(subRecord, "country")})
+# ----------------------------------------
+def report_run(runContext, runOptions, shardFiles):
+    """print what a single file run did, writing its deletes in delta mode"""
+    counts = runContext.counts
+    if runOptions.shardSize and shardFiles:
+        print(f"\n{len(shardFiles)} shard files written")
+    print(f"\n{counts['written']} records written, done!\n")
+    rejectsHandle = runContext.rejectsHandle
+    if rejectsHandle is not None:
+        print(f"{counts['rejected']} records rejected to {rejectsHandle.fileName}\n")
+
+    deltaState = runContext.deltaState
+    if deltaState is not None and deltaState.previous is not None:
+        print(f"{counts['unchanged']} records unchanged since the last run\n")
+        return write_delete_file(deltaState, runOptions.deleteFile)
+    return 0
 
-            for subRecord in sdnEntry.findall("citizenshipList/citizenship"):
-                if getValue(subRecord, "country"):
-                    attrList.append({"CITIZENSHIP": getValue(subRecord, "country")})
 
-            if attrList:
-                jsonData["ATTR_LIST"] = attrList
+# ----------------------------------------
+def write_delete_file(deltaState, deleteFile):
+    """write a delete for anything in the last run that is no longer on the list"""
+    deletedIds = deltaState.deleted_ids()
+    try:
+        with open(deleteFile, "w", encoding="utf-8", newline="") as f:
+            for recordId in deletedIds:
+                f.write(
+                    json.dumps({"DATA_SOURCE": "OFAC", "RECORD_ID": recordId}) + "\n"
+                )
+    except IOError as err:
+        print(f"\ncould not write to {deleteFile}, {err}\n")
+        return -1
+    print(f"{len(deletedIds)} deletes written to {deleteFile}\n")
+    return 0
 
-            # --add any addresses
-            addrList = []
-            for subRecord in sdnEntry.findall("addressList/address"):
-                addrDict = {}
-                if (
-                    getValue(subRecord, "address1")
-                    and getValue(subRecord, "address1") != "Address Unknown"
-                ):
-                    addrDict["ADDR_LINE1"] = getValue(subRecord, "address1")
-                if getValue(subRecord, "address2"):
-                    addrDict["ADDR_LINE2"] = getValue(subRecord, "address2")
-                if getValue(subRecord, "address3"):
-                    addrDict["ADDR_LINE3"] = getValue(subRecord, "address3")
-                if getValue(subRecord, "city"):
-                    addrDict["ADDR_CITY"] = getValue(subRecord, "city")
-                if getValue(subRecord, "stateOrProvince"):
-                    addrDict["ADDR_STATE"] = getValue(subRecord, "stateOrProvince")
-                if getValue(subRecord, "postalCode"):
-                    addrDict["ADDR_POSTAL_CODE"] = getValue(subRecord, "postalCode")
-                if getValue(subRecord, "country"):
-                    addrDict["ADDR_COUNTRY"] = getValue(subRecord, "country")
-                if addrDict:
-                    addrList.append(addrDict)
-                    if (
-                        len(addrDict) == 1
-                        and list(addrDict.keys())[0] == "ADDR_COUNTRY"
-                    ):
-                        updateStat("!ADDRESS", "country only")
-                    else:
-                        updateStat("!ADDRESS", "UNTYPED")
-            if addrList:
-                jsonData["ADDR_LIST"] = addrList
-
-            # --add any ID numbers
-            itemNum = 0
-            idList = []
-            for subRecord in sdnEntry.findall("idList/id"):
-                if getValue(subRecord, "idNumber"):
-
-                    idData = {}
-                    idType = getValue(subRecord, "idType")
-                    idNumber = getValue(subRecord, "idNumber")
-                    idCountry = getValue(subRecord, "idCountry")
-
-                    update_code_stats("idType", idType, idNumber)
-                    senzingAttr = code_conversion_data["idType"][idType]["SENZING_ATTR"]
-                    if idCountry:
-                        update_code_stats("idCountry", idCountry, idType)
-                        senzingCountry = code_conversion_data["idCountry"][idCountry][
-                            "SENZING_DEFAULT"
-                        ]
-                    else:
-                        senzingCountry = ""
-
-                    if senzingAttr:
-                        if senzingAttr == "IMO_NUMBER":
-                            idNumber.replace("IMO ", "")
-                        idData[senzingAttr] = idNumber
-                        if senzingAttr in ("OTHER_ID_NUMBER", "NATIONAL_ID_NUMBER"):
-                            idData[senzingAttr.replace("_NUMBER", "_TYPE")] = idType
-                        if senzingCountry:
-                            idData[senzingAttr.replace("_NUMBER", "_COUNTRY")] = (
-                                senzingCountry
-                            )
-                        idList.append(idData)
 
-                    else:
-                        senzingAttr = "UNKNOWN"
-                        if idType not in jsonData:
-                            jsonData[idType] = idNumber + (
-                                f" ({idCountry})" if idCountry else ""
-                            )
-                        else:
-                            jsonData[idType] += (
-                                " | "
-                                + idNumber
-                                + (f" ({idCountry})" if idCountry else "")
-                            )
-
-                    # updateStat(f'!{senzingAttr}', f"{idType}", f"{idNumber}|{senzingCountry}")
-
-            if idList:
-                jsonData["ID_LIST"] = idList
-
-            # --still some vessel info in this structure
-            if g2RecordType == "VESSEL":
-                if getValue(sdnEntry, "vesselInfo/callSign"):
-                    jsonData["CALL_SIGN"] = getValue(sdnEntry, "vesselInfo/callSign")
-                if getValue(sdnEntry, "vesselInfo/vesselType"):
-                    jsonData["vesselType"] = getValue(sdnEntry, "vesselInfo/vesselType")
-                if getValue(sdnEntry, "vesselInfo/vesselFlag"):
-                    jsonData["vesselFlag"] = getValue(sdnEntry, "vesselInfo/vesselFlag")
-                if getValue(sdnEntry, "vesselInfo/vesselOwner"):
-                    jsonData["vesselOwner"] = getValue(
-                        sdnEntry, "vesselInfo/vesselOwner"
-                    )
-                if getValue(sdnEntry, "vesselInfo/tonnage"):
-                    jsonData["tonnage"] = getValue(sdnEntry, "vesselInfo/tonnage")
-                if getValue(sdnEntry, "vesselInfo/grossRegisteredTonnage"):
-                    jsonData["grossRegisteredTonnage"] = getValue(
-                        sdnEntry, "vesselInfo/grossRegisteredTonnage"
-                    )
-
-            capture_mapped_stats(jsonData)
+# ----------------------------------------
+def processBatch(mapper, inputFiles, runContext, runOptions):
+    """map many sdn files with the one codes table, a file to each worker
+
+    each file gets its own output unless the output is a single file name,
+    in which case the files are appended to it in input order
+    """
+    outputFile, workers = runOptions.outputFile, runOptions.workers
+    outputBufferSize, shardSize = runOptions.bufferSize, runOptions.shardSize
+    combined = bool(outputFile) and not (
+        os.path.isdir(outputFile) or outputFile.endswith(os.sep)
+    )
+    if combined:
+        partDir = tempfile.mkdtemp(prefix="ofac_batch_")
+        outputDir = partDir
+    else:
+        outputDir = outputFile
+        if outputDir:
+            os.makedirs(outputDir, exist_ok=True)
+
+    batchJobs = []
+    for fileNumber, batchInput in enumerate(inputFiles, 1):
+        baseName = input_base_name(os.path.basename(batchInput))
+        if combined:
+            batchOutput = os.path.join(outputDir, f"{fileNumber:05d}.json")
+        else:
+            batchOutput = os.path.join(
+                outputDir or os.path.dirname(batchInput), baseName + ".json"
+            )
+        batchJobs.append(
+            BatchJob(
+                batchInput,
+                batchOutput,
+                outputBufferSize,
+                0 if combined else shardSize,
+            )
+        )
+
+    print(f"\nmapping {len(batchJobs)} files with {workers} workers ...\n")
+    result = 0
+    rowCnt = 0
+    outputFiles = []
+    if workers > 1:
+        pool = multiprocessing.Pool(
+            min(workers, len(batchJobs)),
+            initializer=init_mapper_worker,
+            initargs=(mapper.worker_mapper(mapper.parseCache),),
+        )
+        fileResults = pool.imap(map_sdn_file_worker, batchJobs)
+    else:
+        pool = None
+        fileResults = (
+            run_batch_job_in_process(mapper, batchJob) for batchJob in batchJobs
+        )
 
-        jsonStr = json.dumps(jsonData)
+    try:
+        for batchJob, fileResult in zip(batchJobs, fileResults):
+            if pool:
+                mapper.statPack.merge(fileResult.partialStats)
+                mapper.merge_code_stats(fileResult.codeStats)
+                mapper.timer.merge(fileResult.stageSeconds)
+            if fileResult.errorMessage:
+                print(f"could not map {batchJob.inputFile}: {fileResult.errorMessage}")
+                result = -1
+                continue
+            print(f"{fileResult.rowCnt} records from {batchJob.inputFile}")
+            outputFiles.append(batchJob.outputFile)
+            rowCnt += fileResult.rowCnt
+            runContext.add_written(fileResult.rowCnt)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    if combined:
+        print(f"\nwriting to {outputFile} ...")
         try:
-            outputHandle.write(jsonStr + "\n")
+            outputHandle = OutputWriter(outputFile, outputBufferSize, shardSize)
+            for partFile in outputFiles:
+                with open(partFile, "rb") as partHandle:
+                    partLines = []
+                    for jsonLine in partHandle:
+                        partLines.append(jsonLine.decode("utf-8"))
+                        if len(partLines) >= WORKER_BATCH_SIZE:
+                            outputHandle.write_lines(partLines)
+                            partLines = []
+                    outputHandle.write_lines(partLines)
+            outputHandle.close()
         except IOError as err:
-            print(f"\ncould not write to output file: {err}\n")
-            appError = 1
-            break
-
-    outputHandle.close()
-    print(f"\n{rowCnt} records written, done!\n")
+            print(f"\ncould not write to {outputFile}, {err}\n")
+            result = -1
+        finally:
+            shutil.rmtree(partDir, ignore_errors=True)
 
-    return 0
+    print(f"\n{rowCnt} records written from {len(outputFiles)} files, done!\n")
+    return result
 
 
 # ----------------------------------------
 if __name__ == "__main__":
     appPath = os.path.dirname(os.path.abspath(sys.argv[0]))
 
-    argparser = argparse.ArgumentParser()
-    argparser.add_argument(
-        "-i",
-        "--inputFile",
-        dest="inputFile",
-        type=str,
-        default=None,
-        help="an sdn.xml file downloaded from https://www.treasury.gov/ofac/downloads.",
-    )
-    argparser.add_argument(
-        "-o",
-        "--outputFile",
-        dest="outputFile",
-        type=str,
-        help="output filename, defaults to input file name with a .json extension.",
-    )
-    argparser.add_argument(
-        "-l",
-        "--logFile",
-        dest="logFile",
-        type=str,
-        help="optional statistics filename in json format.",
-    )
-    args = argparser.parse_args()
+    args = mapper_argparser().parse_args()
     inputFile = args.inputFile
     outputFile = args.outputFile
     logFile = args.logFile
+    stateFile = args.stateFile
+    deleteFile = args.deleteFile
+    shardSize = max(args.shardSize, 0)
+    asyncPipeline = args.asyncPipeline
+    metricsFile = args.metricsFile
+    profile = args.profile or bool(metricsFile)
+    cProfileFile = args.cProfileFile
+    tracemallocFile = args.tracemallocFile
+    cacheDir = args.cacheDir
+    screenFile = args.screenFile
+    reviewFile = args.reviewFile
+    rejectsFile = args.rejectsFile
+    offsetsFile = args.offsetsFile
 
     if not (inputFile):
         print("\nPlease supply an input file name with the -i parameter\n")
         sys.exit(1)
 
+    # --a directory or glob pattern maps every file in it in one run
+    inputFiles = batch_input_files(inputFile)
+    batchMode = inputFiles != [inputFile]
+    if batchMode:
+        if not inputFiles:
+            print(f"\nNo xml files found for {inputFile}\n")
+            sys.exit(1)
+        # --these options look at every record of a single ordered output
+        needsRecordPass = bool(stateFile or screenFile or rejectsFile or offsetsFile)
+        streamsOutput = bool(
+            asyncPipeline or outputFile == "-" or SINK_URL.match(outputFile or "")
+        )
+        if needsRecordPass or streamsOutput:
+            print(
+                "\nA batch of files can only be written to files,"
+                " without -s, -x, --rejectsFile or --offsetsFile\n"
+            )
+            sys.exit(1)
+
     # --default the output file if not supplied
-    if not (outputFile):
-        outputFile = inputFile.replace(".xml", ".json")
+    if not (outputFile) and not batchMode:
+        outputFile = "-" if inputFile == "-" else input_base_name(inputFile) + ".json"
+    if not batchMode and (outputFile == "-" or SINK_URL.match(outputFile)):
+        asyncPipeline = True
+        # --progress messages go to stderr when the records go to stdout
+        if outputFile == "-":
+            sys.stdout = sys.stderr
+        if not (deleteFile):
+            deleteFile = input_base_name(inputFile) + "-deletes.json"
+    if not (deleteFile) and not batchMode:
+        deleteFile = split_output_name(outputFile)[0] + "-deletes.json"
 
     codes_filename = (
         "ofac_codes.csv"  # --os.path.dirname(__file__) + os.sep + 'ofac_codes.csv'
@@ -527,15 +874,122 @@ if __name__ == "__main__":
         print(f"\nFile {codes_filename} missing!\n")
         sys.exit(1)
 
-    code_conversion_data, unmapped_code_count = load_codes_file(codes_filename)
-    statPack = {}
-
-    result = processFile()
-
-    save_codes_file(codes_filename)
+    # --a state file turns on delta mode, hashing every record
+    mapper = OfacMapper(
+        codes_filename,
+        options=MapperOptions(
+            statsEnabled=bool(logFile),
+            profile=profile,
+            hashRecords=bool(stateFile or offsetsFile),
+            indexRecords=bool(screenFile),
+            validateRecords=bool(rejectsFile),
+            canonical=args.canonical,
+            hashField=args.hashField,
+        ),
+        parseCache=ParseCache(cacheDir, max(args.cacheSize, 0)) if cacheDir else None,
+    )
+    runContext = RunContext(
+        deltaState=DeltaState.load(stateFile) if stateFile else None,
+        screeningIndex=ScreeningIndexBuilder() if screenFile else None,
+    )
+    if rejectsFile:
+        try:
+            runContext.rejectsHandle = OutputWriter(rejectsFile)
+        except IOError as err:
+            print(f"\ncould not open {rejectsFile}, {err}\n")
+            sys.exit(1)
+    if offsetsFile:
+        try:
+            runContext.offsetsWriter = OffsetsWriter(offsetsFile, outputFile, shardSize)
+        except IOError as err:
+            print(f"\ncould not open {offsetsFile}, {err}\n")
+            sys.exit(1)
+    if profile:
+        runContext.progressMeter = ProgressMeter(max(args.metricsInterval, 0.1))
+
+    if tracemallocFile:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if cProfileFile else None
+    if profiler:
+        profiler.enable()
+
+    runOptions = RunOptions(
+        inputFile,
+        outputFile,
+        deleteFile=deleteFile,
+        workers=max(args.workers, 1),
+        bufferSize=max(args.bufferSize, 1) * 1024,
+        shardSize=shardSize,
+        mmapInput=args.mmapInput,
+    )
+    if batchMode:
+        result = processBatch(mapper, inputFiles, runContext, runOptions)
+    elif asyncPipeline:
+        result = processFileAsync(mapper, runContext, runOptions)
+    else:
+        result = processFile(mapper, runContext, runOptions)
+
+    if runContext.rejectsHandle is not None:
+        runContext.rejectsHandle.close()
+    if runContext.offsetsWriter is not None:
+        runContext.offsetsWriter.close()
+        print(f"Record offsets written to {offsetsFile}\n")
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(cProfileFile)
+        print(f"cProfile stats written to {cProfileFile}\n")
+    if tracemallocFile:
+        write_tracemalloc_file(tracemallocFile, tracemalloc.take_snapshot())
+        tracemalloc.stop()
+        print(f"Memory allocations written to {tracemallocFile}\n")
+
+    runMetrics = None
+    if runContext.progressMeter is not None:
+        runMetrics = runContext.progressMeter.summary(mapper.timer.seconds)
+    if runMetrics:
+        print("seconds per stage:")
+        for stage, seconds in runMetrics["stages"].items():
+            print(f"  {stage:<12} {seconds:10.3f}")
+        print(
+            f"\n{runMetrics['records_per_sec']} records per second,"
+            f" {runMetrics['peak_rss_mb']} MB peak rss\n"
+        )
+    if metricsFile:
+        write_metrics_file(metricsFile, runMetrics)
+        print(f"Metrics written to {metricsFile}\n")
+    if runContext.deltaState is not None and result == 0:
+        runContext.deltaState.save(stateFile)
+        print(f"Record hashes saved to {stateFile}\n")
+    if runContext.screeningIndex is not None and result == 0:
+        keyCount = runContext.screeningIndex.write(screenFile)
+        print(f"{keyCount} screening keys written to {screenFile}\n")
+
+    if mapper.save_codes_file(codes_filename):
+        print(f"Code statistics updated in {codes_filename}\n")
+    else:
+        print(f"{codes_filename} is unchanged\n")
+    reviewCodes = mapper.code_review_report()
+    if reviewCodes:
+        newCodes = [x for x in reviewCodes if x["NEW"]]
+        print(
+            f"{len(reviewCodes)} codes to review in {codes_filename},"
+            f" {len(newCodes)} new this run"
+        )
+        for reviewCode in newCodes[:10]:
+            print(f"  {reviewCode['RAW_TYPE']}: {reviewCode['RAW_CODE']}")
+        if len(newCodes) > 10:
+            print(f"  ... and {len(newCodes) - 10} more")
+        print()
+    if reviewFile:
+        with open(reviewFile, "w", encoding="utf-8") as outfile:
+            json.dump(reviewCodes, outfile, indent=4)
+        print(f"Codes to review written to {reviewFile}\n")
     if logFile:
+        statDict = mapper.statPack.to_dict()
+        if runMetrics:
+            statDict["!METRICS"] = runMetrics
         with open(logFile, "w") as outfile:
-            json.dump(statPack, outfile, indent=4, sort_keys=True)
+            json.dump(statDict, outfile, indent=4, sort_keys=True)
         print(f"Mapping stats written to {logFile}\n")
 
     sys.exit(result)
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import io
+import tracemalloc
+import time
+from collections import Counter
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+# --seconds between the progress reports of --profile
+METRICS_INTERVAL = 10
+
+
+# ----------------------------------------
+class StageTimer:
+    """cumulative seconds spent in each stage of the conversion, each mark
+    charging the time since the last one to the stage just finished"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.seconds = Counter()
+        self.lastMark = time.perf_counter()
+
+    def restart(self):
+        self.lastMark = time.perf_counter()
+
+    def mark(self, stage):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.seconds[stage] += now - self.lastMark
+        self.lastMark = now
+
+    def take(self):
+        """hand over the times gathered so far, starting over empty"""
+        stageSeconds, self.seconds = self.seconds, Counter()
+        return stageSeconds
+
+    def merge(self, stageSeconds):
+        self.seconds.update(stageSeconds)
+
+
+# ----------------------------------------
+class TimedReader(io.RawIOBase):
+    """wraps an input file so the time spent reading it is its own stage"""
+
+    def __init__(self, handle, timer, callerStage="parse"):
+        super().__init__()
+        self.handle = handle
+        self.timer = timer
+        self.callerStage = callerStage
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        self.timer.mark(self.callerStage)
+        data = self.handle.read(size)
+        self.timer.mark("read")
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+# ----------------------------------------
+def current_rss_mb():
+    """resident memory of this process, the peak so far where /proc is missing"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            rssPages = int(f.read().split()[1])
+        return round(rssPages * os.sysconf("SC_PAGE_SIZE") / 1048576, 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_mb()
+
+
+# ----------------------------------------
+def peak_rss_mb():
+    """peak resident memory of this process, None where it cannot be had"""
+    if not resource:
+        return None
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # --linux reports kilobytes, macos bytes
+    return round(peakRss / (1048576 if sys.platform == "darwin" else 1024), 1)
+
+
+# ----------------------------------------
+class ProgressMeter:
+    """reports the throughput and memory of a run every interval seconds"""
+
+    def __init__(self, interval=METRICS_INTERVAL):
+        self.interval = interval
+        self.startTime = time.perf_counter()
+        self.nextReport = self.startTime + interval
+        self.recordCount = 0
+        self.samples = []
+
+    def tick(self, recordCount):
+        self.recordCount = recordCount
+        now = time.perf_counter()
+        if now < self.nextReport:
+            return
+        self.nextReport = now + self.interval
+        sample = self.sample(now)
+        self.samples.append(sample)
+        print(
+            f"{recordCount} records, {sample['records_per_sec']} per second,"
+            f" {sample['rss_mb']} MB rss"
+        )
+
+    def sample(self, now):
+        elapsed = now - self.startTime
+        return {
+            "seconds": round(elapsed, 3),
+            "records": self.recordCount,
+            "records_per_sec": round(self.recordCount / elapsed, 1) if elapsed else 0,
+            "rss_mb": current_rss_mb(),
+        }
+
+    def summary(self, stageSeconds):
+        """the metrics for the whole run"""
+        metrics = self.sample(time.perf_counter())
+        metrics["peak_rss_mb"] = peak_rss_mb()
+        metrics["stages"] = {
+            stage: round(seconds, 3) for stage, seconds in sorted(stageSeconds.items())
+        }
+        metrics["intervals"] = self.samples
+        return metrics
+
+
+# ----------------------------------------
+def write_metrics_file(metrics_filename, metrics):
+    """write the run metrics as prometheus text when the file ends in .prom,
+    as json otherwise"""
+    with open(metrics_filename, "w", encoding="utf-8") as f:
+        if not metrics_filename.endswith(".prom"):
+            json.dump(metrics, f, indent=4)
+            return
+        for name, metricType, helpText, value in (
+            ("records_total", "counter", "records written", metrics["records"]),
+            ("run_seconds", "gauge", "seconds the run took", metrics["seconds"]),
+            (
+                "records_per_second",
+                "gauge",
+                "records written per second",
+                metrics["records_per_sec"],
+            ),
+            (
+                "rss_bytes",
+                "gauge",
+                "resident memory at the end of the run",
+                metrics["rss_mb"],
+            ),
+            (
+                "peak_rss_bytes",
+                "gauge",
+                "peak resident memory",
+                metrics.get("peak_rss_mb"),
+            ),
+        ):
+            if value is None:
+                continue
+            if name.endswith("rss_bytes"):
+                value = int(value * 1048576)
+            f.write(f"# HELP ofac_mapper_{name} {helpText}\n")
+            f.write(f"# TYPE ofac_mapper_{name} {metricType}\n")
+            f.write(f"ofac_mapper_{name} {value}\n")
+        f.write("# HELP ofac_mapper_stage_seconds_total seconds spent in each stage\n")
+        f.write("# TYPE ofac_mapper_stage_seconds_total counter\n")
+        for stage, seconds in metrics["stages"].items():
+            f.write(f'ofac_mapper_stage_seconds_total{{stage="{stage}"}} {seconds}\n')
+
+
+# ----------------------------------------
+def write_tracemalloc_file(tracemalloc_filename, snapshot, lineCount=50):
+    """write the source lines that allocated the most memory still held"""
+    currentSize, peakSize = tracemalloc.get_traced_memory()
+    with open(tracemalloc_filename, "w", encoding="utf-8") as f:
+        f.write(f"traced memory: {currentSize} bytes, peak {peakSize} bytes\n\n")
+        for stat in snapshot.statistics("lineno")[:lineCount]:
+            f.write(f"{stat}\n")
@@ -0,0 +1,123 @@
+from datetime import datetime
+import json
+import re
+import functools
+import hashlib
+from typing import NamedTuple, Optional
+
+# --the attributes that hold a name, one of which a record must have to be
+# --loaded, and the shapes of the dates formatDate produces or leaves as they
+# --are: a full date, a year or month and year, approximate or as a range
+RECORD_NAME_ATTRS = ("NAME_ORG", "NAME_FULL", "NAME_FIRST", "NAME_MIDDLE", "NAME_LAST")
+REQUIRED_RECORD_KEYS = ("DATA_SOURCE", "RECORD_ID")
+DATE_PART = r"(?:\d{4}(?:-\d{2}-\d{2})?|(?:\d{1,2} )?[A-Za-z]{3} \d{4})"
+VALID_DATE = re.compile(
+    rf"(?:(?:circa|ca\.) )?{DATE_PART}(?: to {DATE_PART})?$", re.IGNORECASE
+)
+
+
+# ----------------------------------------
+class SerializedRecord(NamedTuple):
+    """a mapped record as it is written, only the rejectLine set when it fails
+    validation"""
+
+    recordId: str
+    recordHash: Optional[str]
+    jsonLine: Optional[str]
+    screenKeys: Optional[set]
+    rejectLine: Optional[str]
+
+
+# --distinct date strings remembered by formatDate
+DATE_CACHE_SIZE = 4096
+
+# --date patterns with the strptime format that may parse them, in the order
+# --they are tried; anything else, such as a year, "circa 1960" or "1955 to
+# --1958", is left as it is
+DATE_FORMATS = (
+    (re.compile(r"\d{4}-\d{1,2}-\s?\d{1,2}$"), "%Y-%m-%d"),
+    (re.compile(r"\d{1,2}/\s?\d{1,2}/\d{4}$"), "%m/%d/%Y"),
+    (re.compile(r"\d{1,2}/\s?\d{1,2}/\d{2}$"), "%m/%d/%y"),
+    (re.compile(r"\s?\d{1,2}\s+[^\W\d_]+\s+\d{4}$"), "%d %b %Y"),
+    (re.compile(r"\s?\d{1,2}\s+\d{1,2}\s+\d{4}$"), "%d %m %Y"),
+)
+
+
+# ----------------------------------------
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def formatDate(inStr, outputFormat="%Y-%m-%d"):
+    """format a date as yyyy-mm-dd"""
+    # --bypass if not complete
+    outStr = inStr
+
+    # --only the formats whose pattern matches are tried, rather than catching
+    # --the errors of all of them
+    for datePattern, format in DATE_FORMATS:
+        if datePattern.match(inStr):
+            try:
+                outStr = datetime.strftime(
+                    datetime.strptime(inStr, format), outputFormat
+                )
+            except ValueError:
+                continue
+            break
+
+    return outStr
+
+
+# ----------------------------------------
+def remove_empty_tags(d):
+    """remove the None and blank string values from a record and its lists"""
+    if isinstance(d, dict):
+        for k, v in list(d.items()):
+            if v is None or (isinstance(v, str) and not v.strip()):
+                del d[k]
+            else:
+                remove_empty_tags(v)
+    if isinstance(d, list):
+        for v in d:
+            remove_empty_tags(v)
+    return d
+
+
+# ----------------------------------------
+def record_hash(jsonData):
+    """hash a record's content, ignoring the publish date that changes every release"""
+    content = {key: value for key, value in jsonData.items() if key != "PUBLISH_DATE"}
+    return hashlib.blake2b(
+        json.dumps(content, sort_keys=True).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+# ----------------------------------------
+def canonical_record(jsonData):
+    """put a record's lists in a fixed order and drop its empty entries, so the
+    same content always serializes to the same line"""
+    for key, value in list(jsonData.items()):
+        if isinstance(value, list):
+            value = [x for x in value if x]
+            if value:
+                jsonData[key] = sorted(value, key=lambda x: sorted(x.items()))
+            else:
+                del jsonData[key]
+    return jsonData
+
+
+# ----------------------------------------
+def validate_record(jsonData):
+    """the reasons a mapped record is not fit to load, empty when it is"""
+    rejectReasons = [
+        f"missing {key}" for key in REQUIRED_RECORD_KEYS if not jsonData.get(key)
+    ]
+    nameList = jsonData.get("NAME_LIST")
+    if not nameList:
+        rejectReasons.append("missing NAME_LIST")
+    elif not any(
+        nameDict.get(attr) for nameDict in nameList for attr in RECORD_NAME_ATTRS
+    ):
+        rejectReasons.append("no name in NAME_LIST")
+    for attrDict in jsonData.get("ATTR_LIST", []):
+        dateOfBirth = attrDict.get("DATE_OF_BIRTH")
+        if dateOfBirth is not None and not VALID_DATE.match(dateOfBirth):
+            rejectReasons.append(f"bad DATE_OF_BIRTH: {dateOfBirth}")
+    return rejectReasons
@@ -0,0 +1,109 @@
+import os
+import json
+import dataclasses
+from collections import Counter
+from typing import Optional
+
+from ofac_screening import ScreeningIndexBuilder
+from ofac_metrics import ProgressMeter
+from ofac_io import OffsetsWriter, OutputWriter
+
+
+# ----------------------------------------
+def split_rejected_records(jsonRecords, rejectsHandle, deltaState=None):
+    """write the records that failed validation to the rejects file, returning
+    the rest"""
+    rejectLines = [x.rejectLine for x in jsonRecords if x.rejectLine]
+    if not rejectLines:
+        return jsonRecords
+    rejectsHandle.write_lines(rejectLines)
+    if deltaState is not None:
+        # --a rejected record keeps its last hash so it is not deleted, and is
+        # --sent again once it is fixed
+        for jsonRecord in jsonRecords:
+            if jsonRecord.rejectLine:
+                deltaState.keep_previous(jsonRecord.recordId)
+    return [x for x in jsonRecords if not x.rejectLine]
+
+
+# ----------------------------------------
+class DeltaState:
+    """the record hashes of this run against those saved by the last one, to
+    send only what changed and delete what is gone"""
+
+    def __init__(self, previous=None):
+        # --None when there was no last run, so every record counts as new
+        self.previous = previous
+        self.hashes = {}
+
+    @classmethod
+    def load(cls, state_filename):
+        """the state saved by the last run, if it left one"""
+        if not os.path.exists(state_filename):
+            return cls()
+        with open(state_filename, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, state_filename):
+        with open(state_filename, "w", encoding="utf-8") as f:
+            json.dump(self.hashes, f, sort_keys=True)
+
+    def filter_changed(self, jsonRecords):
+        """note each record's hash, keeping only those new or changed since last run"""
+        changedRecords = []
+        for jsonRecord in jsonRecords:
+            recordId, recordHash = jsonRecord.recordId, jsonRecord.recordHash
+            self.hashes[recordId] = recordHash
+            if self.previous is None or self.previous.get(recordId) != recordHash:
+                changedRecords.append(jsonRecord)
+        return changedRecords
+
+    def keep_previous(self, recordId):
+        """carry a record's last hash over, so it is neither deleted nor seen as
+        unchanged once it is sent again"""
+        if self.previous and recordId in self.previous:
+            self.hashes[recordId] = self.previous[recordId]
+
+    def deleted_ids(self):
+        return [x for x in self.previous or () if x not in self.hashes]
+
+
+# ----------------------------------------
+@dataclasses.dataclass
+class RunContext:
+    """what a run does with its records besides writing them, each part left
+    None when it is not wanted, and the counts of the records it handled"""
+
+    rejectsHandle: Optional[OutputWriter] = None
+    screeningIndex: Optional[ScreeningIndexBuilder] = None
+    deltaState: Optional[DeltaState] = None
+    offsetsWriter: Optional[OffsetsWriter] = None
+    progressMeter: Optional[ProgressMeter] = None
+    counts: Counter = dataclasses.field(
+        default_factory=lambda: Counter(written=0, unchanged=0, rejected=0)
+    )
+
+    def route_records(self, jsonRecords, timer):
+        """reject, index, delta filter and note the offsets of a batch of
+        serialized records, returning those to be written"""
+        if self.rejectsHandle is not None:
+            mappedCnt = len(jsonRecords)
+            jsonRecords = split_rejected_records(
+                jsonRecords, self.rejectsHandle, self.deltaState
+            )
+            self.counts["rejected"] += mappedCnt - len(jsonRecords)
+        if self.screeningIndex is not None:
+            self.screeningIndex.add_records(jsonRecords)
+        if self.deltaState is not None:
+            mappedCnt = len(jsonRecords)
+            jsonRecords = self.deltaState.filter_changed(jsonRecords)
+            self.counts["unchanged"] += mappedCnt - len(jsonRecords)
+            timer.mark("delta")
+        if self.offsetsWriter is not None:
+            self.offsetsWriter.add_records(jsonRecords)
+        return jsonRecords
+
+    def add_written(self, rowCnt):
+        self.counts["written"] += rowCnt
+        if self.progressMeter:
+            self.progressMeter.tick(self.counts["written"])
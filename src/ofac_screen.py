@@ -0,0 +1,200 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import argparse
+import json
+import mmap
+import struct
+import time
+from collections import Counter
+
+from ofac_screening import (
+    SCREEN_INDEX_HEADER,
+    SCREEN_INDEX_MAGIC,
+    ScreenIndexHeader,
+    id_key,
+    name_key,
+    name_tokens,
+)
+
+UINT32 = struct.Struct("<I")
+
+
+# ----------------------------------------
+class ScreeningIndex:
+    """the screening index written by ofac_mapper.py -x, memory mapped so it
+    opens at once and a lookup only reads the pages it needs"""
+
+    def __init__(self, index_filename):
+        with open(index_filename, "rb") as f:
+            self.indexMap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.indexMap[: len(SCREEN_INDEX_MAGIC)] != SCREEN_INDEX_MAGIC:
+            self.indexMap.close()
+            raise ValueError(f"{index_filename} is not an ofac screening index")
+        self.header = ScreenIndexHeader._make(
+            SCREEN_INDEX_HEADER.unpack_from(self.indexMap)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+    def close(self):
+        self.indexMap.close()
+
+    def uint(self, sectionPos, itemNumber):
+        return UINT32.unpack_from(self.indexMap, sectionPos + itemNumber * 4)[0]
+
+    def key_at(self, keyNumber):
+        header = self.header
+        keyStart = header.keysPos + self.uint(header.keyOffsetsPos, keyNumber)
+        keyEnd = header.keysPos + self.uint(header.keyOffsetsPos, keyNumber + 1)
+        return self.indexMap[keyStart:keyEnd]
+
+    def record_id(self, recordNumber):
+        header = self.header
+        recordStart = header.recordsPos + self.uint(
+            header.recordOffsetsPos, recordNumber
+        )
+        recordEnd = header.recordsPos + self.uint(
+            header.recordOffsetsPos, recordNumber + 1
+        )
+        return self.indexMap[recordStart:recordEnd].decode("utf-8")
+
+    def record_numbers(self, screenKey):
+        """binary search the sorted keys, returning the key's record numbers"""
+        keyBytes = screenKey.encode("utf-8")
+        low, high = 0, self.header.keyCount
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < keyBytes:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.header.keyCount or self.key_at(low) != keyBytes:
+            return ()
+        postingStart = self.uint(self.header.postingOffsetsPos, low)
+        postingCount = self.uint(self.header.postingOffsetsPos, low + 1) - postingStart
+        return struct.unpack_from(
+            f"<{postingCount}I",
+            self.indexMap,
+            self.header.postingsPos + postingStart * 4,
+        )
+
+    def lookup_name(self, name):
+        """RECORD_IDs with a name of exactly these words, in any order"""
+        return [self.record_id(x) for x in self.record_numbers("N:" + name_key(name))]
+
+    def lookup_id(self, idNumber):
+        """RECORD_IDs with this id number, ignoring case and punctuation"""
+        return [self.record_id(x) for x in self.record_numbers("I:" + id_key(idNumber))]
+
+    def lookup_tokens(self, name, matchAll=True):
+        """RECORD_IDs with names containing all of the words, or when matchAll is
+        off any of them, the records with the most words matched first"""
+        tokens = set(name_tokens(name))
+        if not tokens:
+            return []
+        tokenCounts = Counter()
+        for token in tokens:
+            tokenCounts.update(self.record_numbers("T:" + token))
+        if matchAll:
+            recordNumbers = sorted(
+                x for x, y in tokenCounts.items() if y == len(tokens)
+            )
+        else:
+            recordNumbers = [x for x, _ in tokenCounts.most_common()]
+        return [self.record_id(x) for x in recordNumbers]
+
+
+# ----------------------------------------
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-x",
+        "--screenFile",
+        help="a screening index file written by ofac_mapper.py -x.",
+    )
+    argparser.add_argument(
+        "-n",
+        "--name",
+        dest="names",
+        action="append",
+        default=[],
+        help="a name to look up exactly, its words in any order. Can be repeated.",
+    )
+    argparser.add_argument(
+        "-t",
+        "--tokens",
+        dest="tokens",
+        action="append",
+        default=[],
+        help="words to find in the names, all of them unless --any is given. Can be repeated.",
+    )
+    argparser.add_argument(
+        "-d",
+        "--idNumber",
+        dest="idNumbers",
+        action="append",
+        default=[],
+        help="an id number to look up, such as a passport number. Can be repeated.",
+    )
+    argparser.add_argument(
+        "--any",
+        dest="matchAny",
+        action="store_true",
+        default=False,
+        help="with -t, find names with any of the words, most words matched first.",
+    )
+    args = argparser.parse_args()
+
+    if not args.screenFile:
+        print("\nPlease supply a screening index file with the -x parameter\n")
+        sys.exit(1)
+    try:
+        screeningIndex = ScreeningIndex(args.screenFile)
+    except (IOError, ValueError) as err:
+        print(f"\ncould not open {args.screenFile}: {err}\n")
+        sys.exit(1)
+
+    queries = (
+        [("name", x, screeningIndex.lookup_name) for x in args.names]
+        + [
+            ("tokens", x, lambda x: screeningIndex.lookup_tokens(x, not args.matchAny))
+            for x in args.tokens
+        ]
+        + [("id", x, screeningIndex.lookup_id) for x in args.idNumbers]
+    )
+    if not queries:
+        header = screeningIndex.header
+        print(
+            f"\n{header.recordCount} records and {header.keyCount}"
+            f" keys in {args.screenFile}\n"
+        )
+
+    # --one json line per query so the results can be piped on, stopping
+    # --quietly when the reader, such as head, has all it wants
+    try:
+        with screeningIndex:
+            for queryType, query, lookup in queries:
+                startTime = time.perf_counter()
+                recordIds = lookup(query)
+                microseconds = (time.perf_counter() - startTime) * 1000000
+                print(
+                    json.dumps(
+                        {
+                            "QUERY_TYPE": queryType,
+                            "QUERY": query,
+                            "RECORD_IDS": recordIds,
+                            "MICROSECONDS": round(microseconds, 1),
+                        }
+                    )
+                )
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # --python flushes stdout again on exit, so send that to devnull
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,144 @@
+import os
+import sys
+import re
+import struct
+import unicodedata
+from array import array
+from collections import defaultdict
+from typing import NamedTuple
+
+from ofac_records import RECORD_NAME_ATTRS
+
+# --the screening index file is a header of counts and section offsets, then the
+# --offsets, record numbers and utf-8 text of the sorted keys and record ids,
+# --all little-endian so the file can be memory mapped on any machine
+SCREEN_INDEX_MAGIC = b"OFACSCR1"
+SCREEN_INDEX_HEADER = struct.Struct("<8s8Q")
+SCREEN_TOKEN = re.compile(r"[^\W_]+")
+SCREEN_SKIPPED_ID_ATTRS = ("GENDER",)
+
+
+# ----------------------------------------
+class ScreenIndexHeader(NamedTuple):
+    """the counts and section offsets at the start of a screening index"""
+
+    magic: bytes
+    recordCount: int
+    keyCount: int
+    recordOffsetsPos: int
+    keyOffsetsPos: int
+    postingOffsetsPos: int
+    postingsPos: int
+    recordsPos: int
+    keysPos: int
+
+
+# ----------------------------------------
+def name_tokens(name):
+    """the casefolded words of a name, without accents or punctuation"""
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(x for x in name if not unicodedata.combining(x))
+    return SCREEN_TOKEN.findall(name.casefold())
+
+
+# ----------------------------------------
+def name_key(name):
+    """a name's tokens in sorted order, so word order does not matter"""
+    return " ".join(sorted(name_tokens(name)))
+
+
+# ----------------------------------------
+def id_key(idNumber):
+    """an id number without its spaces, dashes and other punctuation"""
+    return "".join(name_tokens(idNumber))
+
+
+# ----------------------------------------
+def screening_keys(jsonData):
+    """the name (N:), name token (T:) and id number (I:) keys of a mapped record"""
+    screenKeys = set()
+    for nameDict in jsonData.get("NAME_LIST", []):
+        tokens = name_tokens(
+            " ".join(nameDict.get(attr, "") for attr in RECORD_NAME_ATTRS)
+        )
+        if tokens:
+            screenKeys.add("N:" + " ".join(sorted(tokens)))
+            screenKeys.update("T:" + token for token in tokens)
+    for idDict in jsonData.get("ID_LIST", []):
+        for attr, value in idDict.items():
+            if attr.endswith(("_TYPE", "_COUNTRY")) or attr in SCREEN_SKIPPED_ID_ATTRS:
+                continue
+            idNumber = id_key(value)
+            if idNumber:
+                screenKeys.add("I:" + idNumber)
+    return screenKeys
+
+
+# ----------------------------------------
+def uint32_bytes(values):
+    uintArray = array("I", values)
+    if sys.byteorder == "big":
+        uintArray.byteswap()
+    return uintArray.tobytes()
+
+
+# ----------------------------------------
+def blob_offsets(items):
+    """start offset of each item in their concatenation, plus the end"""
+    offsets = [0]
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return offsets
+
+
+# ----------------------------------------
+class ScreeningIndexBuilder:
+    """gathers the screening keys of each record as it is written, then writes
+    them out sorted for ofac_screen.py to look up"""
+
+    def __init__(self):
+        self.recordIds = []
+        self.postings = defaultdict(list)
+
+    def add_records(self, jsonRecords):
+        for jsonRecord in jsonRecords:
+            recordNumber = len(self.recordIds)
+            self.recordIds.append(jsonRecord.recordId)
+            for screenKey in jsonRecord.screenKeys:
+                self.postings[screenKey].append(recordNumber)
+
+    def write(self, index_filename):
+        """write the index, replacing any earlier one only once it is complete"""
+        screenKeys = sorted(self.postings)
+        keyBytes = [x.encode("utf-8") for x in screenKeys]
+        recordBytes = [x.encode("utf-8") for x in self.recordIds]
+        postingOffsets = [0]
+        for screenKey in screenKeys:
+            postingOffsets.append(postingOffsets[-1] + len(self.postings[screenKey]))
+
+        sections = [
+            uint32_bytes(blob_offsets(recordBytes)),
+            uint32_bytes(blob_offsets(keyBytes)),
+            uint32_bytes(postingOffsets),
+            uint32_bytes(
+                x for screenKey in screenKeys for x in self.postings[screenKey]
+            ),
+            b"".join(recordBytes),
+            b"".join(keyBytes),
+        ]
+        sectionPos = [SCREEN_INDEX_HEADER.size]
+        for section in sections[:-1]:
+            sectionPos.append(sectionPos[-1] + len(section))
+
+        tempFile = index_filename + ".tmp"
+        with open(tempFile, "wb") as f:
+            f.write(
+                SCREEN_INDEX_HEADER.pack(
+                    SCREEN_INDEX_MAGIC, len(recordBytes), len(keyBytes), *sectionPos
+                )
+            )
+            for section in sections:
+                f.write(section)
+        os.replace(tempFile, index_filename)
+        return len(keyBytes)
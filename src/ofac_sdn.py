@@ -0,0 +1,262 @@
+import xml.etree.ElementTree as etree
+import re
+from typing import NamedTuple, Optional, Sequence
+
+# --sdn entries sent to a worker process at a time when --workers is used
+WORKER_BATCH_SIZE = 500
+READ_BLOCK_SIZE = 1024 * 1024
+SDN_ENTRY_START = re.compile(rb"<(?:[\w.-]+:)?sdnEntry[\s>]")
+SDN_ENTRY_END = re.compile(rb"</(?:[\w.-]+:)?sdnEntry\s*>")
+XML_ROOT_START = re.compile(rb"<([^?!/\s>]+)[^>]*>")
+
+
+# ----------------------------------------
+def getValue(segment, tagName):
+    """get an xml element text value"""
+    try:
+        value = segment.find(tagName).text.strip()
+    except:
+        value = ""
+    return value
+
+
+# ----------------------------------------
+def iter_sdn_elements(inputHandle, timer=None):
+    """stream the publishInformation and sdnEntry elements, ignoring any name spaces"""
+    xmlRoot = None
+    for event, element in etree.iterparse(inputHandle, events=("start", "end")):
+        if event == "start":
+            if xmlRoot is None:
+                xmlRoot = element
+            continue
+
+        # --name spaces not needed and can mess up the tag lookups
+        if element.tag[0] == "{":
+            if timer:
+                timer.mark("parse")
+            element.tag = element.tag.rpartition("}")[2]
+            if timer:
+                timer.mark("strip")
+
+        if element.tag in ("sdnEntry", "publishInformation"):
+            if timer:
+                timer.mark("parse")
+            yield element
+            # --release everything parsed so far so memory stays flat
+            xmlRoot.clear()
+
+
+# ----------------------------------------
+class SdnAka(NamedTuple):
+    """an aka of an sdnEntry"""
+
+    type: str = ""
+    lastName: str = ""
+    firstName: str = ""
+
+
+class SdnAddress(NamedTuple):
+    """an address of an sdnEntry"""
+
+    address1: str = ""
+    address2: str = ""
+    address3: str = ""
+    city: str = ""
+    stateOrProvince: str = ""
+    postalCode: str = ""
+    country: str = ""
+
+
+class SdnId(NamedTuple):
+    """an id of an sdnEntry"""
+
+    idType: str = ""
+    idNumber: str = ""
+    idCountry: str = ""
+
+
+class SdnVesselInfo(NamedTuple):
+    """the vesselInfo of a Vessel sdnEntry"""
+
+    callSign: str = ""
+    vesselType: str = ""
+    vesselFlag: str = ""
+    vesselOwner: str = ""
+    tonnage: str = ""
+    grossRegisteredTonnage: str = ""
+
+
+class SdnEntry(NamedTuple):
+    """a flat, pre-shaped copy of an sdnEntry element"""
+
+    uid: str = ""
+    sdnType: str = ""
+    lastName: str = ""
+    firstName: str = ""
+    title: str = ""
+    remarks: str = ""
+    # --a shared empty tuple rather than a list when no list is given
+    programs: Sequence[str] = ()
+    akas: Sequence[SdnAka] = ()
+    addresses: Sequence[SdnAddress] = ()
+    ids: Sequence[SdnId] = ()
+    datesOfBirth: Sequence[str] = ()
+    placesOfBirth: Sequence[str] = ()
+    nationalities: Sequence[str] = ()
+    citizenships: Sequence[str] = ()
+    vesselInfo: Optional[SdnVesselInfo] = None
+
+
+# --the SdnEntry fields holding lists
+SDN_ENTRY_LISTS = (
+    "programs",
+    "akas",
+    "addresses",
+    "ids",
+    "datesOfBirth",
+    "placesOfBirth",
+    "nationalities",
+    "citizenships",
+)
+
+
+# --list tag: (SdnEntry attribute, item tag, record class)
+SDN_RECORD_LISTS = {
+    "akaList": ("akas", "aka", SdnAka),
+    "addressList": ("addresses", "address", SdnAddress),
+    "idList": ("ids", "id", SdnId),
+}
+
+# --list tag: (SdnEntry attribute, item tag, value tag)
+SDN_VALUE_LISTS = {
+    "dateOfBirthList": ("datesOfBirth", "dateOfBirthItem", "dateOfBirth"),
+    "placeOfBirthList": ("placesOfBirth", "placeOfBirthItem", "placeOfBirth"),
+    "nationalityList": ("nationalities", "nationality", "country"),
+    "citizenshipList": ("citizenships", "citizenship", "country"),
+}
+
+SDN_ENTRY_FIELDS = frozenset(
+    ("uid", "sdnType", "lastName", "firstName", "title", "remarks")
+)
+
+
+# ----------------------------------------
+def getText(element):
+    """get an xml element's stripped text, empty if none"""
+    return element.text.strip() if element.text else ""
+
+
+# ----------------------------------------
+def extract_record(recordClass, element):
+    """copy the known text children of an element into a record in one pass"""
+    fieldNames = recordClass._fields
+    return recordClass(
+        **{child.tag: getText(child) for child in element if child.tag in fieldNames}
+    )
+
+
+# ----------------------------------------
+def extract_sdn_entry(sdnEntry):
+    """walk an sdnEntry element once and return it as an SdnEntry record"""
+    fields = {field: [] for field in SDN_ENTRY_LISTS}
+    for child in sdnEntry:
+        tag = child.tag
+        if tag in SDN_ENTRY_FIELDS:
+            fields[tag] = getText(child)
+        elif tag in SDN_RECORD_LISTS:
+            attrName, itemTag, recordClass = SDN_RECORD_LISTS[tag]
+            fields[attrName].extend(
+                extract_record(recordClass, item)
+                for item in child
+                if item.tag == itemTag
+            )
+        elif tag in SDN_VALUE_LISTS:
+            attrName, itemTag, valueTag = SDN_VALUE_LISTS[tag]
+            valueList = fields[attrName]
+            for item in child:
+                if item.tag == itemTag:
+                    value = getValue(item, valueTag)
+                    if value:
+                        valueList.append(value)
+        elif tag == "programList":
+            # --every program, as the advanced xml lists them
+            for item in child:
+                if item.tag == "program" and getText(item):
+                    fields["programs"].append(getText(item))
+        elif tag == "vesselInfo":
+            fields["vesselInfo"] = extract_record(SdnVesselInfo, child)
+    return SdnEntry(**fields)
+
+
+# ----------------------------------------
+def strip_namespaces(element):
+    """drop any name space from the tags of an element and its children"""
+    for child in element.iter():
+        if child.tag[0] == "{":
+            child.tag = child.tag.rpartition("}")[2]
+    return element
+
+
+# ----------------------------------------
+def iter_sdn_chunks(inputHandle, batchSize):
+    """split the raw xml into batches of whole sdnEntry elements without parsing
+
+    yields (publish date, xml document) where each document is the original
+    declaration and root tag wrapped around batchSize sdnEntry elements
+    """
+    buffer = b""
+    xmlPrefix = xmlSuffix = None
+    publishDate = ""
+    scanPos = entryCount = 0
+    while True:
+        block = inputHandle.read(READ_BLOCK_SIZE)
+        buffer += block
+
+        # --the xml before the first entry gives the root tag and publish date
+        if xmlPrefix is None:
+            entryStart = SDN_ENTRY_START.search(buffer)
+            if not entryStart:
+                if block:
+                    continue
+                break
+            xmlHead = buffer[: entryStart.start()]
+            rootStart = XML_ROOT_START.search(xmlHead)
+            xmlPrefix = xmlHead[: rootStart.end()]
+            xmlSuffix = b"</" + rootStart.group(1) + b">"
+            headParser = etree.XMLPullParser(events=("end",))
+            headParser.feed(xmlHead)
+            for _, element in headParser.read_events():
+                if strip_namespaces(element).tag == "publishInformation":
+                    publishDate = getValue(element, "Publish_Date")
+            buffer = buffer[entryStart.start() :]
+
+        # --cut off as many complete entries as are buffered
+        while True:
+            entryStart = SDN_ENTRY_START.search(buffer, scanPos)
+            entryEnd = entryStart and SDN_ENTRY_END.search(buffer, entryStart.end())
+            if not entryEnd:
+                break
+            scanPos = entryEnd.end()
+            entryCount += 1
+            if entryCount == batchSize:
+                yield publishDate, xmlPrefix + buffer[:scanPos] + xmlSuffix
+                buffer = buffer[scanPos:]
+                scanPos = entryCount = 0
+
+        if not block:
+            break
+
+    # --a truncated or malformed file must fail here just as it does when it is
+    # --parsed in one piece, so what follows the last entry has to close the root
+    try:
+        if xmlPrefix is None:
+            etree.fromstring(buffer)
+        else:
+            etree.fromstring(xmlPrefix + buffer[scanPos:])
+    except etree.ParseError as err:
+        raise etree.ParseError(
+            f"the xml is incomplete or malformed at its end, {err}"
+        ) from err
+
+    if entryCount:
+        yield publishDate, xmlPrefix + buffer[:scanPos] + xmlSuffix
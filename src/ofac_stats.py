@@ -0,0 +1,419 @@
+import csv
+import random
+import heapq
+import hashlib
+import io
+import math
+from collections import Counter, defaultdict
+
+# --distinct values counted exactly before switching to a hyperloglog estimate,
+# --and to space-saving counters for each code's top 10 in ofac_codes.csv
+DISTINCT_EXACT_LIMIT = 1000
+HLL_PRECISION = 12
+
+# --example values kept for each mapped attribute in the statistics file
+STAT_EXAMPLE_COUNT = 5
+
+
+# ----------------------------------------
+class ReservoirSample:
+    """a uniform random sample of distinct example values"""
+
+    __slots__ = ("size", "seen", "items", "members")
+
+    def __init__(self, size=STAT_EXAMPLE_COUNT):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self.members = set()
+
+    def add(self, value):
+        if value in self.members:
+            return
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(value)
+            self.members.add(value)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < self.size:
+                self.members.discard(self.items[slot])
+                self.items[slot] = value
+                self.members.add(value)
+
+    def merge(self, other):
+        """draw from both samples in proportion to how many values each has seen"""
+        mine, theirs = self.items[:], other.items[:]
+        random.shuffle(mine)
+        random.shuffle(theirs)
+        mineSeen, theirSeen = self.seen, other.seen
+        self.items, self.members = [], set()
+        while len(self.items) < self.size and (mine or theirs):
+            if theirs and (
+                not mine or random.randrange(mineSeen + theirSeen) >= mineSeen
+            ):
+                value = theirs.pop()
+            else:
+                value = mine.pop()
+            if value not in self.members:
+                self.items.append(value)
+                self.members.add(value)
+        self.seen = mineSeen + theirSeen
+
+
+# ----------------------------------------
+class StatCollector:
+    """counts and samples the mapped values, doing nothing when disabled"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counts = Counter()
+        self.samples = {}
+
+    def add(self, cat1, cat2, example=None):
+        if not self.enabled:
+            return
+        statKey = (cat1, cat2)
+        self.counts[statKey] += 1
+        if example:
+            sample = self.samples.get(statKey)
+            if sample is None:
+                sample = self.samples[statKey] = ReservoirSample()
+            sample.add(example)
+
+    def add_record(self, jsonData):
+        """count every attribute of a mapped record by its record type"""
+        if not self.enabled:
+            return
+        record_type = jsonData.get("RECORD_TYPE", "UNKNOWN_RECORD_TYPE")
+        for key1, value1 in jsonData.items():
+            if type(value1) != list:
+                self.add(record_type, key1, value1)
+            else:
+                for subrecord in value1:
+                    for key2, value2 in subrecord.items():
+                        self.add(record_type, key2, value2)
+
+    def take(self):
+        """hand back the stats gathered so far as a new collector and start over"""
+        taken = StatCollector(self.enabled)
+        taken.counts, taken.samples = self.counts, self.samples
+        self.counts, self.samples = Counter(), {}
+        return taken
+
+    def merge(self, other):
+        """fold the stats gathered by a worker process into these"""
+        self.counts.update(other.counts)
+        for statKey, otherSample in other.samples.items():
+            sample = self.samples.get(statKey)
+            if sample is None:
+                self.samples[statKey] = otherSample
+            else:
+                sample.merge(otherSample)
+
+    def to_dict(self):
+        """the stats as {cat1: {cat2: {count, examples}}} for the log file"""
+        statDict = defaultdict(dict)
+        for statKey, count in self.counts.items():
+            stat = {"count": count}
+            if statKey in self.samples:
+                stat["examples"] = self.samples[statKey].items
+            statDict[statKey[0]][statKey[1]] = stat
+        return dict(statDict)
+
+
+# ----------------------------------------
+class TopValues:
+    """a code's value counts, exact up to a limit and then space-saving counters
+    for only the limit's most frequent values
+
+    values are counted exactly a chunk of entries at a time and each chunk is
+    folded in on its own, so the chunks mapped by worker processes merge into
+    the same counters a single process builds
+    """
+
+    __slots__ = ("size", "counts", "errors", "exact", "chunk")
+
+    def __init__(self, size=DISTINCT_EXACT_LIMIT):
+        self.size = size
+        self.counts = {}
+        # --the possible overcount of each counter once some have been dropped
+        self.errors = {}
+        self.exact = True
+        self.chunk = {}
+
+    def add(self, value):
+        self.chunk[value] = self.chunk.get(value, 0) + 1
+
+    def fold(self):
+        """add the values counted since the last fold to the counters"""
+        if self.chunk:
+            self.add_counts(self.chunk, {}, 0)
+            self.chunk = {}
+
+    def merge(self, other):
+        if other.counts:
+            self.add_counts(other.counts, other.errors, other.floor())
+        if other.chunk:
+            self.add_counts(other.chunk, {}, 0)
+
+    def floor(self):
+        """the most a value without a counter may have been seen, 0 while exact"""
+        return 0 if self.exact or not self.counts else min(self.counts.values())
+
+    def add_counts(self, otherCounts, otherErrors, otherFloor):
+        """add another set of counters, keeping the size highest with ties going
+        to the lowest value, so the result does not depend on the order the
+        values were seen in"""
+        counts, errors = self.counts, self.errors
+        # --a value without a counter on one side may have been counted up to
+        # --that side's smallest counter
+        floor = self.floor()
+        if otherFloor:
+            for value in counts.keys() - otherCounts.keys():
+                counts[value] += otherFloor
+                errors[value] = errors.get(value, 0) + otherFloor
+        for value, count in otherCounts.items():
+            error = otherErrors.get(value, 0)
+            if value in counts:
+                counts[value] += count
+            else:
+                counts[value] = floor + count
+                error += floor
+            if error:
+                errors[value] = errors.get(value, 0) + error
+
+        excess = len(counts) - self.size
+        if excess > 0:
+            self.exact = False
+            for value in heapq.nlargest(excess, counts, key=lambda x: (-counts[x], x)):
+                del counts[value]
+                errors.pop(value, None)
+
+    def most_common(self, n):
+        """the n values with the highest guaranteed counts, ties in value order"""
+        self.fold()
+        return heapq.nsmallest(
+            n,
+            (
+                (value, count - self.errors.get(value, 0))
+                for value, count in self.counts.items()
+            ),
+            key=lambda x: (-x[1], x[0]),
+        )
+
+
+# ----------------------------------------
+class DistinctCounter:
+    """counts distinct values exactly up to a limit, then as a hyperloglog"""
+
+    __slots__ = ("values", "registers")
+
+    def __init__(self):
+        self.values = set()
+        self.registers = None
+
+    def add(self, value):
+        if self.registers is None:
+            self.values.add(value)
+            if len(self.values) > DISTINCT_EXACT_LIMIT:
+                self.registers = bytearray(1 << HLL_PRECISION)
+                for exactValue in self.values:
+                    self.add_hashed(exactValue)
+                self.values = None
+        else:
+            self.add_hashed(value)
+
+    def add_hashed(self, value):
+        hashValue = int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        register = hashValue & ((1 << HLL_PRECISION) - 1)
+        rank = 64 - HLL_PRECISION - (hashValue >> HLL_PRECISION).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def merge(self, other):
+        if other.registers is None:
+            for value in other.values:
+                self.add(value)
+            return
+        if self.registers is None:
+            exactValues = self.values
+            self.values, self.registers = None, bytearray(other.registers)
+            for value in exactValues:
+                self.add_hashed(value)
+        else:
+            for register, rank in enumerate(other.registers):
+                if rank > self.registers[register]:
+                    self.registers[register] = rank
+
+    def count(self):
+        if self.registers is None:
+            return len(self.values)
+        registerCount = len(self.registers)
+        estimate = (
+            0.7213 / (1 + 1.079 / registerCount) * registerCount * registerCount
+        ) / sum(2.0**-rank for rank in self.registers)
+        emptyCount = self.registers.count(0)
+        if estimate <= 2.5 * registerCount and emptyCount:
+            estimate = registerCount * math.log(registerCount / emptyCount)
+        return int(round(estimate))
+
+
+# ----------------------------------------
+class CodeValueStats:
+    """bounded memory counts of the values seen for a raw code"""
+
+    __slots__ = ("recordCount", "topValues", "distinct")
+
+    def __init__(self):
+        self.recordCount = 0
+        self.topValues = TopValues()
+        self.distinct = DistinctCounter()
+
+    def add(self, value):
+        self.distinct.add(value)
+        if value != "null":
+            self.recordCount += 1
+            self.topValues.add(value)
+
+    def merge(self, other):
+        self.recordCount += other.recordCount
+        self.topValues.merge(other.topValues)
+        self.distinct.merge(other.distinct)
+
+
+# ----------------------------------------
+def load_codes_file(codes_filename):
+    code_conversion_data = {}
+    unmapped_code_count = 0
+    with open(codes_filename, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            row["RAW_TYPE"] = row["RAW_TYPE"]
+            row["RAW_CODE"] = row["RAW_CODE"]
+            if row["RAW_TYPE"] not in code_conversion_data:
+                code_conversion_data[row["RAW_TYPE"]] = {}
+            row["COUNT"] = 0
+            row["VALUES"] = CodeValueStats()
+            code_conversion_data[row["RAW_TYPE"]][row["RAW_CODE"]] = row
+            if row["REVIEWED"].upper() != "Y":
+                unmapped_code_count += 1
+    return code_conversion_data, unmapped_code_count
+
+
+# ----------------------------------------
+def save_codes_file(codes_filename, code_conversion_data):
+    headers = [
+        "REVIEWED",
+        "RAW_TYPE",
+        "RAW_CODE",
+        "RAW_MODIFIER",
+        "SENZING_ATTR",
+        "SENZING_DEFAULT",
+        "RECORD_COUNT",
+        "UNIQUE_COUNT",
+        "UNIQUE_PERCENT",
+        "TOP1",
+        "TOP2",
+        "TOP3",
+        "TOP4",
+        "TOP5",
+        "TOP6",
+        "TOP7",
+        "TOP8",
+        "TOP9",
+        "TOP10",
+    ]
+
+    # --rendered first so an unchanged file is left alone, with the same line
+    # --endings as the file shipped in the repo
+    codesText = io.StringIO()
+    writer = csv.writer(codesText, lineterminator="\n")
+    writer.writerow(headers)
+    for raw_type in sorted(code_conversion_data.keys()):
+        for raw_code in sorted(code_conversion_data[raw_type].keys()):
+            code_data = code_conversion_data[raw_type][raw_code]
+            uniq_record_count = code_data["VALUES"].recordCount
+            uniq_value_count = code_data["VALUES"].distinct.count()
+            topValues = [
+                f"{value} ({count})"
+                for value, count in code_data["VALUES"].topValues.most_common(10)
+            ]
+            while len(topValues) < 10:
+                topValues.append("")
+
+            code_record = [
+                code_data["REVIEWED"],
+                code_data["RAW_TYPE"],
+                code_data["RAW_CODE"],
+                code_data["RAW_MODIFIER"],
+                code_data["SENZING_ATTR"],
+                code_data["SENZING_DEFAULT"],
+                uniq_record_count,
+                uniq_value_count,
+                (
+                    round(float(uniq_value_count) / uniq_record_count * 100, 2)
+                    if uniq_record_count
+                    else 0
+                ),
+                topValues[0],
+                topValues[1],
+                topValues[2],
+                topValues[3],
+                topValues[4],
+                topValues[5],
+                topValues[6],
+                topValues[7],
+                topValues[8],
+                topValues[9],
+            ]
+            writer.writerow(code_record)
+
+    try:
+        with open(codes_filename, "r", encoding="utf-8", newline="") as f:
+            if f.read() == codesText.getvalue():
+                return False
+    except FileNotFoundError:
+        pass
+    with open(codes_filename, "w", encoding="utf-8", newline="") as f:
+        f.write(codesText.getvalue())
+    return True
+
+
+# ----------------------------------------
+def code_review_report(code_conversion_data):
+    """the codes not marked as reviewed, new ones first, with what this run
+    saw of them so they can be mapped before the next run"""
+    reviewCodes = []
+    for raw_type in sorted(code_conversion_data.keys()):
+        for raw_code in sorted(code_conversion_data[raw_type].keys()):
+            code_data = code_conversion_data[raw_type][raw_code]
+            if code_data["REVIEWED"].upper() == "Y":
+                continue
+            reviewCodes.append(
+                {
+                    "RAW_TYPE": raw_type,
+                    "RAW_CODE": raw_code,
+                    "NEW": code_data.get("NEW", False),
+                    "SENZING_ATTR": code_data["SENZING_ATTR"],
+                    "SENZING_DEFAULT": code_data["SENZING_DEFAULT"],
+                    "RECORD_COUNT": code_data["VALUES"].recordCount,
+                    "EXAMPLES": [
+                        value
+                        for value, _ in code_data["VALUES"].topValues.most_common(
+                            STAT_EXAMPLE_COUNT
+                        )
+                    ],
+                }
+            )
+    reviewCodes.sort(key=lambda x: (not x["NEW"], -x["RECORD_COUNT"]))
+    return reviewCodes
+
+
+# ----------------------------------------
+def count_code(code_data, example_value=None):
+    code_data["COUNT"] += 1
+    if example_value:
+        code_data["VALUES"].add(example_value)
@@ -0,0 +1,144 @@
+import json
+import os
+
+import pytest
+
+SDN_HEADER = """<?xml version="1.0" standalone="yes"?>
+<sdnList xmlns="https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/XSD">
+  <publishInformation>
+    <Publish_Date>10/14/2026</Publish_Date>
+    <Record_Count>{count}</Record_Count>
+  </publishInformation>
+"""
+
+ID_TYPES = ["Passport", "National ID No.", "SWIFT/BIC", "Tax ID No.", "Website"]
+COUNTRIES = ["Cuba", "Iran", "Afghanistan", "Argentina", "Nigeria", "Malta"]
+
+
+# --an advanced xml file with an individual, an entity and a vessel, its
+# --programs listed after the parties as in SDN_ADVANCED.XML
+SDN_ADVANCED = """<?xml version="1.0" encoding="utf-8"?>
+<Sanctions xmlns="https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/ADVANCED_XML">
+  <DateOfIssue><Year>2026</Year><Month>10</Month><Day>14</Day></DateOfIssue>
+  <ReferenceValueSets>
+    <AliasTypeValues><AliasType ID="1400">A.K.A.</AliasType><AliasType ID="1403">Name</AliasType></AliasTypeValues>
+    <CountryValues><Country ID="11">Afghanistan</Country><Country ID="13">Cuba</Country><Country ID="14">Nigeria</Country></CountryValues>
+    <FeatureTypeValues><FeatureType ID="1">Vessel Call Sign</FeatureType><FeatureType ID="8">Birthdate</FeatureType><FeatureType ID="9">Place of Birth</FeatureType><FeatureType ID="10">Nationality Country</FeatureType><FeatureType ID="25">Location</FeatureType><FeatureType ID="504">SWIFT/BIC</FeatureType></FeatureTypeValues>
+    <IDRegDocTypeValues><IDRegDocType ID="1571">Passport</IDRegDocType></IDRegDocTypeValues>
+    <LocPartTypeValues><LocPartType ID="1451">ADDRESS1</LocPartType><LocPartType ID="1454">CITY</LocPartType></LocPartTypeValues>
+    <NamePartTypeValues><NamePartType ID="1520">Last Name</NamePartType><NamePartType ID="1521">First Name</NamePartType><NamePartType ID="1525">Entity Name</NamePartType><NamePartType ID="1526">Vessel Name</NamePartType></NamePartTypeValues>
+    <PartySubTypeValues><PartySubType ID="1" PartyTypeID="2">Vessel</PartySubType><PartySubType ID="3" PartyTypeID="2">Unknown</PartySubType><PartySubType ID="4" PartyTypeID="1">Unknown</PartySubType></PartySubTypeValues>
+    <PartyTypeValues><PartyType ID="1">Individual</PartyType><PartyType ID="2">Entity</PartyType></PartyTypeValues>
+    <SanctionsTypeValues><SanctionsType ID="1">Program</SanctionsType><SanctionsType ID="2">Block</SanctionsType></SanctionsTypeValues>
+    <ScriptValues><Script ID="215">Latin</Script><Script ID="220">Arabic</Script></ScriptValues>
+  </ReferenceValueSets>
+  <Locations>
+    <Location ID="25"><LocationCountry CountryID="13"/><LocationPart LocPartTypeID="1454"><LocationPartValue><Value>Havana</Value></LocationPartValue></LocationPart></Location>
+    <Location ID="27"><LocationCountry CountryID="11"/><LocationPart LocPartTypeID="1451"><LocationPartValue><Value>12 Main St</Value></LocationPartValue></LocationPart><LocationPart LocPartTypeID="1454"><LocationPartValue><Value>Kabul</Value></LocationPartValue></LocationPart></Location>
+    <Location ID="40"><LocationCountry CountryID="14"/></Location>
+  </Locations>
+  <IDRegDocuments>
+    <IDRegDocument ID="1" IDRegDocTypeID="1571" IdentityID="1173" IssuedBy-CountryID="11"><IDRegistrationNo>A123456</IDRegistrationNo></IDRegDocument>
+  </IDRegDocuments>
+  <DistinctParties>
+    <DistinctParty FixedRef="173">
+      <Comment>DOB 1955 to 1958.</Comment>
+      <Profile ID="173" PartySubTypeID="4">
+        <Identity ID="1173">
+          <Alias AliasTypeID="1403" Primary="true">
+            <DocumentedName><DocumentedNamePart><NamePartValue NamePartGroupID="701" ScriptID="220">ابا</NamePartValue></DocumentedNamePart></DocumentedName>
+            <DocumentedName><DocumentedNamePart><NamePartValue NamePartGroupID="702" ScriptID="215">Juan</NamePartValue></DocumentedNamePart><DocumentedNamePart><NamePartValue NamePartGroupID="701" ScriptID="215">ABACHA</NamePartValue></DocumentedNamePart></DocumentedName>
+          </Alias>
+          <Alias AliasTypeID="1400" Primary="false">
+            <DocumentedName><DocumentedNamePart><NamePartValue NamePartGroupID="701" ScriptID="215">ABATCHA</NamePartValue></DocumentedNamePart></DocumentedName>
+          </Alias>
+          <NamePartGroups><MasterNamePartGroup><NamePartGroup ID="701" NamePartTypeID="1520"/></MasterNamePartGroup><MasterNamePartGroup><NamePartGroup ID="702" NamePartTypeID="1521"/></MasterNamePartGroup></NamePartGroups>
+        </Identity>
+        <Feature FeatureTypeID="25"><FeatureVersion><VersionLocation LocationID="27"/></FeatureVersion></Feature>
+        <Feature FeatureTypeID="10"><FeatureVersion><VersionLocation LocationID="40"/></FeatureVersion></Feature>
+        <Feature FeatureTypeID="9"><FeatureVersion><VersionDetail>Kano, Nigeria</VersionDetail></FeatureVersion></Feature>
+        <Feature FeatureTypeID="8"><FeatureVersion><DatePeriod><Start><From><Year>1955</Year><Month>1</Month><Day>12</Day></From></Start><End><To><Year>1955</Year><Month>1</Month><Day>12</Day></To></End></DatePeriod></FeatureVersion></Feature>
+        <Feature FeatureTypeID="8"><FeatureVersion><DatePeriod><Start Approximate="true"><From><Year>1955</Year><Month>1</Month><Day>1</Day></From></Start><End><To><Year>1958</Year><Month>12</Month><Day>31</Day></To></End></DatePeriod></FeatureVersion></Feature>
+      </Profile>
+    </DistinctParty>
+    <DistinctParty FixedRef="306">
+      <Profile ID="306" PartySubTypeID="3">
+        <Identity ID="1306">
+          <Alias AliasTypeID="1403" Primary="true"><DocumentedName><DocumentedNamePart><NamePartValue NamePartGroupID="901" ScriptID="215">BANCO NACIONAL DE CUBA</NamePartValue></DocumentedNamePart></DocumentedName></Alias>
+          <NamePartGroups><MasterNamePartGroup><NamePartGroup ID="901" NamePartTypeID="1525"/></MasterNamePartGroup></NamePartGroups>
+        </Identity>
+        <Feature FeatureTypeID="25"><FeatureVersion><VersionLocation LocationID="25"/></FeatureVersion></Feature>
+        <Feature FeatureTypeID="504"><FeatureVersion><VersionDetail>BNCUCUHH</VersionDetail></FeatureVersion></Feature>
+      </Profile>
+    </DistinctParty>
+    <DistinctParty FixedRef="15036">
+      <Profile ID="15036" PartySubTypeID="1">
+        <Identity ID="15036">
+          <Alias AliasTypeID="1403" Primary="true"><DocumentedName><DocumentedNamePart><NamePartValue NamePartGroupID="801" ScriptID="215">ALPHA</NamePartValue></DocumentedNamePart></DocumentedName></Alias>
+          <NamePartGroups><MasterNamePartGroup><NamePartGroup ID="801" NamePartTypeID="1526"/></MasterNamePartGroup></NamePartGroups>
+        </Identity>
+        <Feature FeatureTypeID="1"><FeatureVersion><VersionDetail>9HXX</VersionDetail></FeatureVersion></Feature>
+      </Profile>
+    </DistinctParty>
+  </DistinctParties>
+  <SanctionsEntries>
+    <SanctionsEntry ProfileID="173"><SanctionsMeasure SanctionsTypeID="1"><Comment>SDGT</Comment></SanctionsMeasure><SanctionsMeasure SanctionsTypeID="1"><Comment>IRAN</Comment></SanctionsMeasure></SanctionsEntry>
+    <SanctionsEntry ProfileID="306"><SanctionsMeasure SanctionsTypeID="1"><Comment>CUBA</Comment></SanctionsMeasure><SanctionsMeasure SanctionsTypeID="2"><Comment/></SanctionsMeasure></SanctionsEntry>
+    <SanctionsEntry ProfileID="15036"><SanctionsMeasure SanctionsTypeID="1"><Comment>IRAN</Comment></SanctionsMeasure></SanctionsEntry>
+  </SanctionsEntries>
+</Sanctions>
+"""
+
+
+# ----------------------------------------
+def sdn_entry(uid, lastName="ALPHA", firstName=""):
+    """an Individual sdnEntry whose ids, addresses and dates vary with its uid"""
+    country = COUNTRIES[uid % len(COUNTRIES)]
+    return f"""  <sdnEntry>
+    <uid>{uid}</uid>
+    <firstName>{firstName}</firstName>
+    <lastName>{lastName}</lastName>
+    <sdnType>Individual</sdnType>
+    <programList><program>SDGT</program></programList>
+    <idList>
+      <id><uid>1</uid><idType>{ID_TYPES[uid % len(ID_TYPES)]}</idType><idNumber>A-{uid:06d}</idNumber><idCountry>{country}</idCountry></id>
+      <id><uid>2</uid><idType>Passport</idType><idNumber>P{uid % 97}</idNumber></id>
+    </idList>
+    <addressList><address><uid>1</uid><city>City {uid % 13}</city><country>{country}</country></address></addressList>
+    <dateOfBirthList><dateOfBirthItem><uid>1</uid><dateOfBirth>{uid % 28 + 1:02d} Jan {1940 + uid % 50}</dateOfBirth><mainEntry>true</mainEntry></dateOfBirthItem></dateOfBirthList>
+  </sdnEntry>
+"""
+
+
+# ----------------------------------------
+def read_records(jsonFile):
+    """the records of a json lines file"""
+    with open(jsonFile, "r", encoding="utf-8") as f:
+        return [json.loads(x) for x in f]
+
+
+# ----------------------------------------
+@pytest.fixture
+def codes_file():
+    return os.path.join(os.path.dirname(__file__), "..", "src", "ofac_codes.csv")
+
+
+# ----------------------------------------
+@pytest.fixture
+def make_sdn_file(tmp_path):
+    """write an sdn.xml of the entries given, or of that many generated ones"""
+
+    def make(entries, fileName="sdn.xml"):
+        if isinstance(entries, int):
+            entries = [
+                sdn_entry(uid, f"NAME{uid}", f"Given {uid % 7}")
+                for uid in range(1, entries + 1)
+            ]
+        xmlFile = tmp_path / fileName
+        xmlFile.write_text(
+            SDN_HEADER.format(count=len(entries)) + "".join(entries) + "</sdnList>\n",
+            encoding="utf-8",
+        )
+        return str(xmlFile)
+
+    return make
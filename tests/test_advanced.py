@@ -0,0 +1,87 @@
+import io
+
+from conftest import SDN_ADVANCED, sdn_entry
+import ofac_mapper as om
+
+
+# ----------------------------------------
+class PipeReader(io.RawIOBase):
+    """a raw stream that cannot seek, like stdin from a pipe"""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.stream.readinto(buffer)
+
+
+# ----------------------------------------
+def test_advanced_xml_records(tmp_path, codes_file):
+    advancedFile = tmp_path / "sdn_advanced.xml"
+    advancedFile.write_text(SDN_ADVANCED, encoding="utf-8")
+
+    jsonRecords = list(om.OfacMapper(codes_file).iter_records(str(advancedFile)))
+    # --the vessel is left out like any other unmapped sdnType
+    assert [x["RECORD_ID"] for x in jsonRecords] == ["173", "306"]
+
+    person, bank = jsonRecords
+    assert person["RECORD_TYPE"] == "PERSON"
+    assert person["PUBLISH_DATE"] == "10/14/2026"
+    assert person["SDN_PROGRAM"] == "SDGT, IRAN"
+    assert person["SDN_REMARKS"] == "DOB 1955 to 1958."
+    assert person["NAME_LIST"] == [
+        {"NAME_TYPE": "PRIMARY", "NAME_LAST": "ABACHA", "NAME_FIRST": "Juan"},
+        {"NAME_TYPE": "AKA", "NAME_LAST": "ABATCHA"},
+    ]
+    assert person["ATTR_LIST"] == [
+        {"DATE_OF_BIRTH": "1955-01-12"},
+        {"DATE_OF_BIRTH": "circa 1955 to 1958"},
+        {"PLACE_OF_BIRTH": "Kano, Nigeria"},
+        {"NATIONALITY": "Nigeria"},
+    ]
+    assert person["ADDR_LIST"] == [
+        {
+            "ADDR_LINE1": "12 Main St",
+            "ADDR_CITY": "Kabul",
+            "ADDR_COUNTRY": "Afghanistan",
+        }
+    ]
+    assert person["ID_LIST"] == [
+        {"PASSPORT_NUMBER": "A123456", "PASSPORT_COUNTRY": "AFG"}
+    ]
+
+    assert bank["RECORD_TYPE"] == "ORGANIZATION"
+    assert bank["SDN_PROGRAM"] == "CUBA"
+    assert bank["NAME_LIST"] == [
+        {"NAME_TYPE": "PRIMARY", "NAME_ORG": "BANCO NACIONAL DE CUBA"}
+    ]
+    assert bank["ADDR_LIST"] == [{"ADDR_CITY": "Havana", "ADDR_COUNTRY": "Cuba"}]
+    assert bank["SWIFT/BIC"] == "BNCUCUHH"
+
+
+# ----------------------------------------
+def test_both_schemas_keep_every_program(codes_file, make_sdn_file):
+    xmlEntry = sdn_entry(173, "ABACHA", "Juan").replace(
+        "<program>SDGT</program>", "<program>SDGT</program><program>IRAN</program>"
+    )
+    sdnRecords = list(om.OfacMapper(codes_file).iter_records(make_sdn_file([xmlEntry])))
+    advancedRecords = list(
+        om.OfacMapper(codes_file).iter_records(io.BytesIO(SDN_ADVANCED.encode()))
+    )
+    assert sdnRecords[0]["SDN_PROGRAM"] == "SDGT, IRAN"
+    assert advancedRecords[0]["SDN_PROGRAM"] == "SDGT, IRAN"
+
+
+# ----------------------------------------
+def test_advanced_xml_that_cannot_be_rewound(codes_file, capsys):
+    inputHandle = io.BufferedReader(PipeReader(SDN_ADVANCED.encode()))
+    assert not inputHandle.seekable()
+
+    jsonRecords = list(om.OfacMapper(codes_file).iter_records(inputHandle))
+    assert "the programs will not be mapped" in capsys.readouterr().out
+    assert [x["RECORD_ID"] for x in jsonRecords] == ["173", "306"]
+    assert not any("SDN_PROGRAM" in x for x in jsonRecords)
+    assert jsonRecords[0]["NAME_LIST"][0]["NAME_LAST"] == "ABACHA"
@@ -0,0 +1,58 @@
+import os
+
+from conftest import sdn_entry
+import ofac_mapper as om
+from ofac_cache import ParseCache
+
+
+# ----------------------------------------
+def cache_files(cacheDir):
+    return sorted(x for x in os.listdir(cacheDir) if x.endswith(".pickle"))
+
+
+# ----------------------------------------
+def test_rerun_reads_the_cache(tmp_path, codes_file, make_sdn_file, monkeypatch):
+    sdnFile = make_sdn_file(30)
+    cacheDir = str(tmp_path / "cache")
+    expected = list(om.OfacMapper(codes_file).iter_records(sdnFile))
+
+    mapper = om.OfacMapper(codes_file, parseCache=ParseCache(cacheDir))
+    assert list(mapper.iter_records(sdnFile)) == expected
+    assert len(cache_files(cacheDir)) == 1
+
+    # --a hit never parses the xml
+    def no_parse(*_):
+        raise AssertionError("parsed a cached file")
+
+    monkeypatch.setattr("ofac_cache.iter_sdn_entries", no_parse)
+    parseCache = ParseCache(cacheDir)
+    with open(sdnFile, "rb") as inputHandle:
+        assert parseCache.has_entries(inputHandle)
+    mapper = om.OfacMapper(codes_file, parseCache=parseCache)
+    assert list(mapper.iter_records(sdnFile)) == expected
+
+
+# ----------------------------------------
+def test_least_recently_used_is_evicted(tmp_path, codes_file, make_sdn_file):
+    cacheDir = str(tmp_path / "cache")
+    parseCache = ParseCache(cacheDir)
+    mapper = om.OfacMapper(codes_file, parseCache=parseCache)
+
+    def map_list(name):
+        entries = [sdn_entry(uid, f"{name}{uid}") for uid in range(1, 31)]
+        list(mapper.iter_records(make_sdn_file(entries, f"{name}.xml")))
+        with open(tmp_path / f"{name}.xml", "rb") as inputHandle:
+            return os.path.basename(parseCache.cache_file(inputHandle))
+
+    cacheA, cacheB = map_list("A"), map_list("B")
+    # --room for two cache files, with A used before B and then used again
+    parseCache.maxBytes = (
+        max(os.path.getsize(os.path.join(cacheDir, x)) for x in (cacheA, cacheB)) * 2
+        + 100
+    )
+    os.utime(os.path.join(cacheDir, cacheA), (1000, 1000))
+    os.utime(os.path.join(cacheDir, cacheB), (2000, 2000))
+    assert map_list("A") == cacheA
+
+    cacheC = map_list("C")
+    assert cache_files(cacheDir) == sorted([cacheA, cacheC])
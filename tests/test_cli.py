@@ -0,0 +1,216 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from conftest import read_records, sdn_entry
+
+MAPPER_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "src", "ofac_mapper.py")
+
+
+# ----------------------------------------
+@pytest.fixture
+def run_mapper(tmp_path, codes_file):
+    """run ofac_mapper.py in tmp_path, which has its own copy of the codes file"""
+    shutil.copy(codes_file, tmp_path / "ofac_codes.csv")
+
+    def run(*args, stdin=None):
+        return subprocess.run(
+            [sys.executable, MAPPER_SCRIPT, *args],
+            cwd=tmp_path,
+            input=stdin,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+    return run
+
+
+# ----------------------------------------
+@pytest.mark.parametrize("runArgs", [[], ["-w", "2"], ["--async"]])
+def test_truncated_xml_fails_the_run(tmp_path, make_sdn_file, run_mapper, runArgs):
+    with open(make_sdn_file(1200), "rb") as f:
+        (tmp_path / "cut.xml").write_bytes(f.read()[:30000])
+
+    result = run_mapper("-i", "cut.xml", "-o", "cut.json", *runArgs)
+    assert result.returncode != 0
+    assert "XML Error" in result.stdout
+    assert "records written, done!" not in result.stdout
+
+
+# ----------------------------------------
+def test_delta_run_writes_changes_and_deletes(tmp_path, make_sdn_file, run_mapper):
+    entries = [sdn_entry(uid, f"NAME{uid}") for uid in range(1, 21)]
+    make_sdn_file(entries)
+    result = run_mapper("-i", "sdn.xml", "-s", "state.json")
+    assert result.returncode == 0
+    assert len(read_records(tmp_path / "sdn.json")) == 20
+
+    # --drop two entries and rename one, then map the list again
+    entries = entries[:5] + entries[7:]
+    entries[0] = sdn_entry(1, "RENAMED")
+    make_sdn_file(entries)
+    result = run_mapper("-i", "sdn.xml", "-s", "state.json")
+    assert result.returncode == 0
+    assert "17 records unchanged since the last run" in result.stdout
+
+    jsonRecords = read_records(tmp_path / "sdn.json")
+    assert [x["RECORD_ID"] for x in jsonRecords] == ["1"]
+    assert jsonRecords[0]["NAME_LIST"][0]["NAME_LAST"] == "RENAMED"
+    assert read_records(tmp_path / "sdn-deletes.json") == [
+        {"DATA_SOURCE": "OFAC", "RECORD_ID": "6"},
+        {"DATA_SOURCE": "OFAC", "RECORD_ID": "7"},
+    ]
+
+    # --a third run with nothing changed sends and deletes nothing
+    result = run_mapper("-i", "sdn.xml", "-s", "state.json")
+    assert "18 records unchanged since the last run" in result.stdout
+    assert read_records(tmp_path / "sdn.json") == []
+    assert read_records(tmp_path / "sdn-deletes.json") == []
+
+
+# ----------------------------------------
+@pytest.mark.parametrize("runArgs", [[], ["-w", "2"]])
+def test_batch_reports_a_corrupt_gzip_and_maps_the_rest(
+    tmp_path, make_sdn_file, run_mapper, runArgs
+):
+    inputDir = tmp_path / "in"
+    inputDir.mkdir()
+    shutil.move(make_sdn_file(10, "a.xml"), inputDir / "a.xml")
+    with open(make_sdn_file(20, "b.xml"), "rb") as f:
+        xmlBytes = f.read()
+    (inputDir / "b.xml.gz").write_bytes(gzip.compress(xmlBytes))
+    (inputDir / "c.xml.gz").write_bytes(gzip.compress(xmlBytes)[:500])
+
+    result = run_mapper("-i", "in", "-o", "out/", "-l", "stats.json", *runArgs)
+    assert result.returncode != 0
+    assert "could not map in/c.xml.gz" in result.stdout
+    assert "30 records written from 2 files" in result.stdout
+    assert len(read_records(tmp_path / "out" / "a.json")) == 10
+    assert len(read_records(tmp_path / "out" / "b.json")) == 20
+    assert (tmp_path / "stats.json").exists()
+    assert "Code statistics updated in ofac_codes.csv" in result.stdout
+
+
+# ----------------------------------------
+def test_tcp_output_without_a_port_is_a_usage_error(make_sdn_file, run_mapper):
+    make_sdn_file(5)
+    result = run_mapper("-i", "sdn.xml", "-o", "tcp://127.0.0.1")
+    assert result.returncode != 0
+    assert "tcp://127.0.0.1 needs a port" in result.stdout
+    assert "Traceback" not in result.stderr
+
+
+# ----------------------------------------
+@pytest.mark.parametrize("outputFile", ["out.json", "out.json.gz", "out.json.zst"])
+def test_delta_deletes_file_drops_the_output_extensions(
+    tmp_path, make_sdn_file, run_mapper, outputFile
+):
+    if outputFile.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    make_sdn_file([sdn_entry(uid, f"NAME{uid}") for uid in range(1, 4)])
+    assert (
+        run_mapper("-i", "sdn.xml", "-o", outputFile, "-s", "state.json").returncode
+        == 0
+    )
+
+    make_sdn_file([sdn_entry(1, "NAME1")])
+    result = run_mapper("-i", "sdn.xml", "-o", outputFile, "-s", "state.json")
+    assert result.returncode == 0
+    assert "2 deletes written to out-deletes.json" in result.stdout
+    assert [x["RECORD_ID"] for x in read_records(tmp_path / "out-deletes.json")] == [
+        "2",
+        "3",
+    ]
+
+
+# ----------------------------------------
+def test_offsets_follow_the_shards(tmp_path, make_sdn_file, run_mapper):
+    make_sdn_file(10)
+    runArgs = ["-i", "sdn.xml", "-o", "out.json", "--shardSize", "4", "--hashField"]
+    result = run_mapper(*runArgs, "--offsetsFile", "offsets.tsv")
+    assert result.returncode == 0
+    assert "3 shard files written" in result.stdout
+
+    with open(tmp_path / "offsets.tsv", "r", encoding="utf-8") as f:
+        offsetRows = [x.rstrip("\n").split("\t") for x in f]
+    assert offsetRows[0] == ["RECORD_ID", "RECORD_HASH", "FILE", "OFFSET", "LENGTH"]
+    assert [x[2] for x in offsetRows[1:]] == (
+        ["out-00001.json"] * 4 + ["out-00002.json"] * 4 + ["out-00003.json"] * 2
+    )
+    for recordId, recordHash, fileName, offset, length in offsetRows[1:]:
+        with open(tmp_path / fileName, "rb") as f:
+            f.seek(int(offset))
+            jsonLine = f.read(int(length))
+        assert jsonLine.endswith(b"\n")
+        jsonData = json.loads(jsonLine)
+        assert (jsonData["RECORD_ID"], jsonData["RECORD_HASH"]) == (
+            recordId,
+            recordHash,
+        )
+
+
+# ----------------------------------------
+@pytest.mark.parametrize("runArgs", [[], ["--async"]])
+def test_rejects_file_holds_the_records_without_a_name(
+    tmp_path, make_sdn_file, run_mapper, runArgs
+):
+    entries = [sdn_entry(uid, f"NAME{uid}") for uid in range(1, 6)]
+    entries[2] = sdn_entry(3, "")
+    make_sdn_file(entries)
+    result = run_mapper("-i", "sdn.xml", "--rejectsFile", "rejects.json", *runArgs)
+    assert result.returncode == 0
+    assert "1 records rejected to rejects.json" in result.stdout
+
+    assert [x["RECORD_ID"] for x in read_records(tmp_path / "sdn.json")] == [
+        "1",
+        "2",
+        "4",
+        "5",
+    ]
+    rejects = read_records(tmp_path / "rejects.json")
+    assert [x["REJECT_REASONS"] for x in rejects] == [["missing NAME_LIST"]]
+    assert rejects[0]["RECORD"]["RECORD_ID"] == "3"
+
+
+# ----------------------------------------
+@pytest.mark.parametrize(
+    "inputFile, runArgs",
+    [
+        ("sdn.xml", ["--mmap"]),
+        ("sdn.xml.gz", []),
+        ("sdn.xml.gz", ["-w", "2"]),
+        ("sdn.zip", []),
+        ("sdn.xml.zst", []),
+        ("-", []),
+    ],
+)
+def test_compressed_and_piped_inputs(
+    tmp_path, make_sdn_file, run_mapper, inputFile, runArgs
+):
+    with open(make_sdn_file(60), "rb") as f:
+        xmlBytes = f.read()
+    assert run_mapper("-i", "sdn.xml", "-o", "plain.json").returncode == 0
+
+    stdin = None
+    if inputFile == "-":
+        stdin = xmlBytes.decode("utf-8")
+    elif inputFile.endswith(".gz"):
+        (tmp_path / inputFile).write_bytes(gzip.compress(xmlBytes))
+    elif inputFile.endswith(".zip"):
+        with zipfile.ZipFile(tmp_path / inputFile, "w") as zipHandle:
+            zipHandle.writestr("sdn.xml", xmlBytes)
+    elif inputFile.endswith(".zst"):
+        zstandard = pytest.importorskip("zstandard")
+        (tmp_path / inputFile).write_bytes(zstandard.compress(xmlBytes))
+
+    result = run_mapper("-i", inputFile, "-o", "out.json", *runArgs, stdin=stdin)
+    assert result.returncode == 0
+    assert "60 records written, done!" in result.stdout
+    assert read_records(tmp_path / "out.json") == read_records(tmp_path / "plain.json")
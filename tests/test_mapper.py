@@ -0,0 +1,134 @@
+import json
+import os
+
+from conftest import sdn_entry
+import ofac_mapper as om
+from ofac_batch import map_sdn_file
+from ofac_io import OUTPUT_BUFFER_SIZE
+
+
+# ----------------------------------------
+def test_serialized_records_match_output_file(tmp_path, codes_file, make_sdn_file):
+    sdnFile = make_sdn_file(30)
+    outputFile = str(tmp_path / "out.json")
+    options = om.MapperOptions(canonical=True, hashField=True)
+    map_sdn_file(
+        om.OfacMapper(codes_file, options=options),
+        sdnFile,
+        outputFile,
+        OUTPUT_BUFFER_SIZE,
+        0,
+    )
+
+    mapper = om.OfacMapper(codes_file, options=options)
+    jsonLines = list(mapper.iter_records(sdnFile, serialize=True))
+    with open(outputFile, "r", encoding="utf-8", newline="") as f:
+        assert jsonLines == f.readlines()
+    assert '"RECORD_HASH": ' in jsonLines[0]
+
+    jsonRecord = mapper.serialize_record(next(mapper.iter_records(sdnFile)))
+    assert jsonRecord.recordId == "1"
+    assert jsonRecord.jsonLine == jsonLines[0]
+    assert f'"RECORD_HASH": "{jsonRecord.recordHash}"' in jsonRecord.jsonLine
+    assert jsonRecord.screenKeys is None and jsonRecord.rejectLine is None
+
+
+# ----------------------------------------
+def test_workers_match_a_single_process(tmp_path, codes_file, make_sdn_file):
+    """the records and ofac_codes.csv stats do not depend on the worker count,
+    even once each id type has more distinct values than are counted exactly"""
+    sdnFile = make_sdn_file(12000)
+    results = []
+    for workerCount in (1, 3):
+        mapper = om.OfacMapper(codes_file, options=om.MapperOptions(hashRecords=True))
+        with open(sdnFile, "rb") as inputHandle:
+            jsonRecords = [
+                record
+                for recordBatch in mapper.iter_serialized(inputHandle, workerCount)
+                for record in recordBatch
+            ]
+        savedCodes = str(tmp_path / f"codes-{workerCount}.csv")
+        mapper.save_codes_file(savedCodes)
+        with open(savedCodes, "r", encoding="utf-8") as f:
+            results.append((jsonRecords, f.read()))
+
+    assert len(results[0][0]) == 12000
+    assert results[0] == results[1]
+
+
+# ----------------------------------------
+def test_process_file_from_import(tmp_path, codes_file, make_sdn_file, capsys):
+    sdnFile = make_sdn_file(25)
+    outputFile = str(tmp_path / "out.json")
+    runOptions = om.RunOptions(sdnFile, outputFile, shardSize=10)
+
+    result = om.processFile(om.OfacMapper(codes_file), om.RunContext(), runOptions)
+    assert result == 0
+    assert "3 shard files written" in capsys.readouterr().out
+
+    expected = list(om.OfacMapper(codes_file).iter_records(sdnFile, serialize=True))
+    jsonLines = []
+    for shardNumber in (1, 2, 3):
+        with open(tmp_path / f"out-{shardNumber:05d}.json", "r", encoding="utf-8") as f:
+            jsonLines.extend(f.readlines())
+    assert jsonLines == expected
+
+
+# ----------------------------------------
+def test_canonical_records_do_not_depend_on_list_order(codes_file, make_sdn_file):
+    xmlEntry = sdn_entry(6, "NAME6", "Given")
+    idLines = [x for x in xmlEntry.splitlines(True) if x.lstrip().startswith("<id>")]
+    swappedEntry = xmlEntry.replace(idLines[0] + idLines[1], idLines[1] + idLines[0])
+    assert swappedEntry != xmlEntry
+
+    jsonLines = {}
+    for canonical in (False, True):
+        options = om.MapperOptions(canonical=canonical)
+        jsonLines[canonical] = [
+            next(
+                om.OfacMapper(codes_file, options=options).iter_records(
+                    make_sdn_file([x]), serialize=True
+                )
+            )
+            for x in (xmlEntry, swappedEntry)
+        ]
+
+    assert jsonLines[False][0] != jsonLines[False][1]
+    assert jsonLines[True][0] == jsonLines[True][1]
+    jsonData = json.loads(jsonLines[True][0])
+    assert list(jsonData) == sorted(jsonData)
+    assert jsonData["ID_LIST"] == sorted(
+        jsonData["ID_LIST"], key=lambda x: sorted(x.items())
+    )
+
+
+# ----------------------------------------
+def test_codes_file_is_only_rewritten_when_it_changes(
+    tmp_path, codes_file, make_sdn_file
+):
+    sdnFile = make_sdn_file(40)
+    savedCodes = str(tmp_path / "codes.csv")
+    mapper = om.OfacMapper(codes_file)
+    list(mapper.iter_records(sdnFile))
+    assert mapper.save_codes_file(savedCodes)
+    with open(savedCodes, "rb") as f:
+        savedBytes = f.read()
+    assert b"\r\n" not in savedBytes
+
+    # --the same list mapped again leaves the file as it is
+    os.utime(savedCodes, (0, 0))
+    mapper = om.OfacMapper(savedCodes)
+    list(mapper.iter_records(sdnFile))
+    assert not mapper.save_codes_file(savedCodes)
+    assert os.stat(savedCodes).st_mtime == 0
+
+    # --a new id type is added for review and the file rewritten
+    xmlEntry = sdn_entry(43, "NAME43").replace("Tax ID No.", "Brand New Type")
+    mapper = om.OfacMapper(savedCodes)
+    list(mapper.iter_records(make_sdn_file([xmlEntry])))
+    newCodes = [x for x in mapper.code_review_report() if x["NEW"]]
+    assert [(x["RAW_TYPE"], x["RAW_CODE"]) for x in newCodes] == [
+        ("idType", "Brand New Type")
+    ]
+    assert mapper.save_codes_file(savedCodes)
+    assert os.stat(savedCodes).st_mtime != 0
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from conftest import read_records
+import ofac_mapper as om
+
+
+# ----------------------------------------
+def test_run_pipeline_from_import(tmp_path, codes_file, make_sdn_file):
+    sdnFile = make_sdn_file(50)
+    outputFile = str(tmp_path / "out.json")
+
+    mapper = om.OfacMapper(codes_file)
+    with open(sdnFile, "rb") as inputHandle:
+        counts = asyncio.run(
+            om.run_pipeline(mapper, inputHandle, om.open_async_sink(outputFile))
+        )
+
+    expected = list(om.OfacMapper(codes_file).iter_records(sdnFile))
+    assert counts["written"] == 50
+    assert read_records(outputFile) == expected
+
+
+# ----------------------------------------
+def test_run_pipeline_with_run_context(tmp_path, codes_file, make_sdn_file):
+    sdnFile = make_sdn_file(20)
+    mapper = om.OfacMapper(
+        codes_file, options=om.MapperOptions(hashRecords=True, indexRecords=True)
+    )
+
+    # --a second run with nothing changed sends nothing and deletes nothing
+    previous = om.DeltaState()
+    previous.filter_changed(
+        [mapper.serialize_record(x) for x in mapper.iter_records(sdnFile)]
+    )
+    runContext = om.RunContext(
+        deltaState=om.DeltaState(previous.hashes),
+        screeningIndex=om.ScreeningIndexBuilder(),
+    )
+    outputFile = str(tmp_path / "out.json")
+    with open(sdnFile, "rb") as inputHandle:
+        counts = asyncio.run(
+            om.run_pipeline(
+                mapper, inputHandle, om.open_async_sink(outputFile), runContext
+            )
+        )
+
+    assert counts["written"] == 0
+    assert counts["unchanged"] == 20
+    assert not runContext.deltaState.deleted_ids()
+    assert len(runContext.screeningIndex.recordIds) == 20
+
+
+# ----------------------------------------
+async def pipeline_to_server(mapper, sdnFile, handle_client, sinkUrl):
+    """run the pipeline into a local server on a free port, returning the sink"""
+    server = await asyncio.start_server(handle_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        with open(sdnFile, "rb") as inputHandle:
+            await om.run_pipeline(
+                mapper, inputHandle, om.open_async_sink(sinkUrl.format(port=port))
+            )
+
+
+# ----------------------------------------
+def test_run_pipeline_to_tcp(codes_file, make_sdn_file):
+    sdnFile = make_sdn_file(250)
+    received = []
+
+    async def handle_client(reader, writer):
+        received.append(await reader.read())
+        writer.close()
+
+    async def run():
+        await pipeline_to_server(
+            om.OfacMapper(codes_file), sdnFile, handle_client, "tcp://127.0.0.1:{port}"
+        )
+        # --let the server finish reading what the sink sent before it closed
+        while not received:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    expected = list(om.OfacMapper(codes_file).iter_records(sdnFile, serialize=True))
+    assert b"".join(received).decode("utf-8") == "".join(expected)
+
+
+# ----------------------------------------
+def test_run_pipeline_to_http(codes_file, make_sdn_file):
+    sdnFile = make_sdn_file(250)
+    requests = []
+
+    async def handle_client(reader, writer):
+        while True:
+            requestLine = await reader.readline()
+            if not requestLine:
+                break
+            headers = {}
+            while True:
+                headerLine = (await reader.readline()).decode("latin-1").strip()
+                if not headerLine:
+                    break
+                name, _, value = headerLine.partition(":")
+                headers[name.lower()] = value.strip()
+            body = await reader.readexactly(int(headers["content-length"]))
+            requests.append((requestLine, headers["content-type"], body))
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+        writer.close()
+
+    asyncio.run(
+        pipeline_to_server(
+            om.OfacMapper(codes_file),
+            sdnFile,
+            handle_client,
+            "http://127.0.0.1:{port}/records",
+        )
+    )
+    expected = list(om.OfacMapper(codes_file).iter_records(sdnFile, serialize=True))
+    assert len(requests) == 3
+    assert {x[0] for x in requests} == {b"POST /records HTTP/1.1\r\n"}
+    assert {x[1] for x in requests} == {"application/x-ndjson"}
+    assert b"".join(x[2] for x in requests).decode("utf-8") == "".join(expected)
+
+
+# ----------------------------------------
+def test_tcp_sink_needs_a_port():
+    with pytest.raises(ValueError, match="needs a port"):
+        om.open_async_sink("tcp://127.0.0.1")
@@ -0,0 +1,92 @@
+import itertools
+import random
+from datetime import datetime
+
+import pytest
+
+from ofac_records import formatDate, VALID_DATE
+
+BASELINE_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d %b %Y", "%d %m %Y")
+
+
+# ----------------------------------------
+def baseline_format_date(inStr):
+    """formatDate as it was, trying each format in turn and catching its error"""
+    for dateFormat in BASELINE_DATE_FORMATS:
+        try:
+            return datetime.strptime(inStr, dateFormat).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return inStr
+
+
+# ----------------------------------------
+@pytest.mark.parametrize(
+    "dateStr, expected",
+    [
+        ("1955-01-12", "1955-01-12"),
+        ("1955-1-2", "1955-01-02"),
+        ("01/12/1955", "1955-01-12"),
+        ("1/ 2/1955", "1955-01-02"),
+        ("01/12/75", "1975-01-12"),
+        ("12 Jan 1955", "1955-01-12"),
+        ("2 jan 1955", "1955-01-02"),
+        (" 2 Jan 1955", "1955-01-02"),
+        ("12 01 1955", "1955-01-12"),
+        ("31 Feb 1955", "31 Feb 1955"),
+        ("12 January 1955", "12 January 1955"),
+        ("Jan 1955", "Jan 1955"),
+        ("1955", "1955"),
+        ("circa 1960", "circa 1960"),
+        ("1955 to 1958", "1955 to 1958"),
+        ("", ""),
+    ],
+)
+def test_format_date(dateStr, expected):
+    assert formatDate(dateStr) == expected
+    assert baseline_format_date(dateStr) == expected
+
+
+# ----------------------------------------
+def test_format_date_matches_the_baseline():
+    """the patterns only skip formats that could not have parsed the string"""
+    randomizer = random.Random(4)
+    firstParts = ["1", "07", "12", "31", "32", " 7", "1955", "2026", "Jan"]
+    middleParts = ["1", "02", "12", "13", "Jan", "feb", "DEC", "Sept", "2026"]
+    lastParts = ["1", "07", "31", "55", "1955", "2026", "Jan"]
+    seps = [" ", "  ", "/", "/ ", "-", "- ", "\t"]
+    edges = ["", "", "", "", " ", "\n", "x"]
+    dateStrs = []
+    for _ in range(20000):
+        firstSep = randomizer.choice(seps)
+        secondSep = randomizer.choice([firstSep] * 3 + seps)
+        dateStrs.append(
+            randomizer.choice(edges)
+            + randomizer.choice(firstParts)
+            + firstSep
+            + randomizer.choice(middleParts)
+            + secondSep
+            + randomizer.choice(lastParts)
+            + randomizer.choice(edges)
+        )
+    # --and every day, month and year the five formats could take
+    dateStrs += [
+        f"{first}{sep}{middle}{sep}{last}"
+        for first, middle, last in itertools.product(firstParts, middleParts, lastParts)
+        for sep in seps
+    ]
+    for dateStr in dateStrs:
+        assert formatDate(dateStr) == baseline_format_date(dateStr), repr(dateStr)
+
+
+# ----------------------------------------
+def test_formatted_dates_are_valid():
+    for dateStr in (
+        "12 Jan 1955",
+        "01/12/55",
+        "Jan 1955",
+        "circa 1960",
+        "1955 to 1958",
+    ):
+        assert VALID_DATE.match(formatDate(dateStr))
+    assert not VALID_DATE.match(formatDate("12 January 1955"))
@@ -0,0 +1,57 @@
+import pytest
+
+import ofac_mapper as om
+from ofac_screen import ScreeningIndex
+from ofac_screening import ScreeningIndexBuilder
+
+
+# ----------------------------------------
+@pytest.fixture
+def screen_file(tmp_path, codes_file, make_sdn_file):
+    """a screening index of 200 generated entries"""
+    mapper = om.OfacMapper(codes_file, options=om.MapperOptions(indexRecords=True))
+    builder = ScreeningIndexBuilder()
+    builder.add_records(
+        [mapper.serialize_record(x) for x in mapper.iter_records(make_sdn_file(200))]
+    )
+    indexFile = str(tmp_path / "sdn.idx")
+    assert builder.write(indexFile) == len(builder.postings)
+    return indexFile
+
+
+# ----------------------------------------
+def test_lookup_name_in_any_word_order(screen_file):
+    with ScreeningIndex(screen_file) as screeningIndex:
+        assert screeningIndex.header.recordCount == 200
+        assert screeningIndex.lookup_name("NAME12, Given 5") == ["12"]
+        assert screeningIndex.lookup_name("given 5 name12") == ["12"]
+        assert screeningIndex.lookup_name("Given 5") == []
+
+
+# ----------------------------------------
+def test_lookup_tokens(screen_file):
+    with ScreeningIndex(screen_file) as screeningIndex:
+        given3 = [str(x) for x in range(1, 201) if x % 7 == 3]
+        assert screeningIndex.lookup_tokens("given 3") == given3
+        assert screeningIndex.lookup_tokens("3 name11") == []
+
+        anyWords = screeningIndex.lookup_tokens("3 name11", matchAll=False)
+        assert sorted(anyWords, key=int) == sorted(given3 + ["11"], key=int)
+        assert screeningIndex.lookup_tokens("...") == []
+
+
+# ----------------------------------------
+def test_lookup_id_ignores_case_and_punctuation(screen_file):
+    with ScreeningIndex(screen_file) as screeningIndex:
+        assert screeningIndex.lookup_id("a000041") == ["41"]
+        assert screeningIndex.lookup_id("A-000041") == ["41"]
+        assert screeningIndex.lookup_id("p 5") == ["5", "102", "199"]
+        assert screeningIndex.lookup_id("Z999") == []
+
+
+# ----------------------------------------
+def test_rejects_other_files(tmp_path):
+    otherFile = tmp_path / "other.idx"
+    otherFile.write_bytes(b"not an index" * 10)
+    with pytest.raises(ValueError):
+        ScreeningIndex(str(otherFile))